@@ -2,6 +2,8 @@
     Package initialisation for fileinfo
 '''
 from .fileinfo import *
+from .asyncfileinfo import AsyncFileInfo
+from .instrumentation import Instrumentation, LatencyHistogram
 
 __version__ = "1.0"
 __author__ = "George Oliveira"
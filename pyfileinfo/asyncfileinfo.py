@@ -0,0 +1,246 @@
+'''
+   Asyncio counterpart of the FileInfo class
+'''
+
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .fileinfo import FileInfo
+
+DEFAULT_BATCH_SIZE = 256
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_default_executor():
+    '''
+    get_default_executor() -> ThreadPoolExecutor
+    Returns the bounded thread pool shared by the AsyncFileInfo objects created without an executor.
+    '''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="AsyncFileInfo")
+        return _executor
+
+
+def set_default_executor(executor):
+    '''
+    set_default_executor(executor) -> None
+    Replaces the thread pool shared by the AsyncFileInfo objects created without an executor.
+    '''
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def _take(iterator, count):
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) == count:
+            break
+    return batch
+
+
+def _method(name):
+    async def method(self, *args, **kwargs):
+        return self._wrap(await self._run(getattr(self.fileinfo, name), *args, **kwargs))
+    method.__name__ = name
+    method.__doc__ = '''
+        afi.%s(...) -> coroutine
+        Awaitable version of FileInfo.%s(), run on the executor; FileInfo results are returned as AsyncFileInfo objects.
+        ''' % (name, name)
+    return method
+
+
+def _getter(name):
+    def fget(self):
+        return self._call(getattr, self.fileinfo, name)
+    return property(fget, doc='''
+        type: awaitable
+        Awaitable version of FileInfo.%s, read on the executor.
+        ''' % name)
+
+
+def _setter(name):
+    async def method(self, value):
+        await self._run(setattr, self.fileinfo, name, value)
+    method.__name__ = "set_" + name
+    method.__doc__ = '''
+        afi.set_%s(value) -> coroutine
+        Awaitable setter of FileInfo.%s, run on the executor.
+        ''' % (name, name)
+    return method
+
+
+def _iterator(name):
+    async def method(self, *args, **kwargs):
+        # the argument checks made when the iterator is created touch the file system too
+        iterator = await self._run(getattr(self.fileinfo, name), *args, **kwargs)
+        try:
+            while True:
+                batch = await self._run(_take, iterator, self.batch_size)
+                for fi in batch:
+                    yield self._wrap(fi)
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            await self._run(iterator.close)
+    method.__name__ = name
+    method.__doc__ = '''
+        afi.%s(...) -> async generator
+        Asynchronous version of FileInfo.%s(), for use with 'async for'.
+        The directory is read on the executor in batches of 'batch_size' entries, so a listing does not cost one executor hop per entry.
+        ''' % (name, name)
+    return method
+
+
+def _read_chunks(iterator):
+    # the chunks are views of a buffer reused for the next one, so each is copied before it leaves the executor
+    for chunk in iterator:
+        return bytes(chunk)
+    return None
+
+
+class AsyncFileInfo(object):
+    '''
+    AsyncFileInfo(path, executor=None, batch_size=256, cache_stat=False, ttl=None, dont_sync=False) -> AsyncFileInfo object
+    Asyncio counterpart of FileInfo: every method is a coroutine and every property an awaitable, whose blocking calls run on 'executor'
+    (defaults to a bounded thread pool shared by all instances). Setters are coroutines named set_<property>.
+    'path' may also be a FileInfo object to wrap.
+    '''
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self, path, executor=None, batch_size=DEFAULT_BATCH_SIZE, cache_stat=False, ttl=None, dont_sync=False):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        if isinstance(path, FileInfo):
+            self.__fileinfo = path
+        else:
+            self.__fileinfo = FileInfo(path, cache_stat, ttl, dont_sync)
+        self.__executor = executor
+        self.batch_size = batch_size
+
+    #----------------------- Methods ------------------------------
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return 'AsyncFileInfo(r"%s")' % self.original_path
+
+    def __aiter__(self):
+        '''
+        Implement aiter(self).
+        '''
+        return self.iter_items()
+
+    def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.__executor or get_default_executor(), lambda: func(*args, **kwargs))
+
+    async def _run(self, func, *args, **kwargs):
+        return await self._call(func, *args, **kwargs)
+
+    def _wrap(self, result):
+        if isinstance(result, FileInfo):
+            return AsyncFileInfo(result, self.__executor, self.batch_size)
+        if isinstance(result, list) and result and isinstance(result[0], (FileInfo, list)):
+            return [self._wrap(item) for item in result]
+        return result
+
+    #------------------------ Fields ---------------------------------
+    @property
+    def fileinfo(self):
+        '''
+        type: FileInfo
+        The wrapped FileInfo object.
+        '''
+        return self.__fileinfo
+
+    @property
+    def original_path(self):
+        '''
+        type: str
+        The path originally specified by the user, whether relative or absolute.
+        '''
+        return self.__fileinfo.original_path
+
+    #----------------- Properties ---------------------------------
+    @property
+    def directory(self):
+        '''
+        type: awaitable
+        Awaitable version of FileInfo.directory, returning the parent directory as an AsyncFileInfo object.
+        '''
+        return self.__directory()
+
+    async def __directory(self):
+        return self._wrap(await self._run(getattr, self.__fileinfo, "directory"))
+
+    #----------------------- Iterators ------------------------------
+    async def iter_chunks(self, *args, **kwargs):
+        '''
+        afi.iter_chunks(...) -> async generator over bytes
+        Asynchronous version of FileInfo.iter_chunks(), for use with 'async for'. Each chunk is read on the executor and yielded as a bytes copy.
+        '''
+        iterator = await self._run(self.__fileinfo.iter_chunks, *args, **kwargs)
+        try:
+            while True:
+                chunk = await self._run(_read_chunks, iterator)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await self._run(iterator.close)
+
+    async def watch(self, *args, **kwargs):
+        '''
+        afi.watch(...) -> async generator over WatchEvent
+        Asynchronous version of FileInfo.watch(), for use with 'async for': yields the events until the generator is closed,
+        which closes the watcher. Each wait for changes runs on the executor, for at most half a second.
+        '''
+        watcher = await self._run(self.__fileinfo.watch, *args, **kwargs)
+        reading = None
+        try:
+            while True:
+                reading = self._call(watcher.read, 0.5)
+                # shielded, so a cancelled task still lets the read finish below
+                events = await asyncio.shield(reading)
+                reading = None
+                for event in events:
+                    yield event
+        finally:
+            if reading is not None:
+                # wake the read and wait for it, so the descriptors it selects on are not closed under it
+                watcher.stop()
+                await asyncio.wait([reading])
+            watcher.close()
+
+
+for _name in ("append_text", "copy_to", "copy_to_directory", "create", "create_text", "create_directory",
+              "create_subdirectory", "create_subdirectory_tree", "decrypt", "delete", "delete_tree", "encrypt",
+              "get_access_control", "get_access_control_string", "set_access_control", "set_access_control_string",
+              "move_to", "move_to_directory", "rename", "open", "open_shared", "open_text", "open_unicode_text",
+              "open_read", "open_write", "mmap", "replace", "write_atomic", "get_directories", "get_files", "get_items",
+              "get_file_set", "get_item_set",
+              "get_directory_length", "get_directory_usage", "compare_with", "compare", "diff", "compress", "uncompress",
+              "join", "hash", "find_duplicates", "sync_to", "snapshot", "stat", "refresh"):
+    setattr(AsyncFileInfo, _name, _method(_name))
+
+for _name in ("iter_directories", "iter_files", "iter_items", "iter_lines"):
+    setattr(AsyncFileInfo, _name, _iterator(_name))
+
+for _name in ("attributes", "creation_time", "directory_name", "extension", "full_name", "is_read_only",
+              "last_access_time", "last_write_time", "name", "base_name"):
+    setattr(AsyncFileInfo, _name, _getter(_name))
+    setattr(AsyncFileInfo, "set_" + _name, _setter(_name))
+
+for _name in ("full_path", "exists", "length", "is_directory", "is_file", "root", "parent"):
+    setattr(AsyncFileInfo, _name, _getter(_name))
+
+del _name
@@ -0,0 +1,291 @@
+'''
+   Crash-safe file writes for FileInfo class
+'''
+
+import os
+import sys
+import errno
+import shutil
+import binascii
+import tempfile
+import threading
+
+_libc = None
+_libc_lock = threading.Lock()
+
+
+_TEMP_FLAGS = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+
+def fsync_directory(path):
+    '''
+    fsync_directory(path) -> None
+    Flushes the directory 'path' to disk, making the entries created, renamed or removed in it durable.
+    Does nothing on platforms where directories can't be opened (Windows).
+    '''
+    if sys.platform.startswith("win"):
+        return
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _syncfs(path):
+    '''
+    Flushes the whole file system holding 'path' with a single syncfs(2) call. Returns False where syncfs is unavailable.
+    '''
+    global _libc
+    if not sys.platform.startswith("linux"):
+        return False
+    with _libc_lock:
+        if _libc is None:
+            try:
+                import ctypes
+                import ctypes.util
+                _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+                _libc.syncfs
+            except (OSError, AttributeError):
+                _libc = False
+    if not _libc:
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if _libc.syncfs(fd) != 0:
+            import ctypes
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+    finally:
+        os.close(fd)
+    return True
+
+
+def _create_temp(path):
+    '''
+    Creates a new temporary file next to 'path' with the permissions 0o666 minus the process umask, as open() would,
+    returning (file descriptor, temporary path). Unlike tempfile.mkstemp (0o600), the umask is applied by the kernel, never read.
+    '''
+    directory, name = os.path.split(path)
+    for _ in range(100):
+        temp = os.path.join(directory, ".%s.%s.tmp" % (name, binascii.hexlify(os.urandom(6)).decode("ascii")))
+        try:
+            return os.open(temp, _TEMP_FLAGS, 0o666), temp
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, "No usable temporary file name found", directory)
+
+
+def _write_temp(path, data, mode):
+    '''
+    Writes 'data' to a new temporary file next to 'path', returning (temporary path, file descriptor) with the descriptor still open.
+    '''
+    fd, temp = _create_temp(path)
+    try:
+        if mode is None:
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except OSError:
+                # a new file keeps the permissions it was created with
+                pass
+        if mode is not None and hasattr(os, "fchmod"):
+            os.fchmod(fd, mode)
+        with open(fd, 'wb', closefd=False) as f:
+            if isinstance(data, str):
+                data = data.encode("UTF-8")
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                for chunk in data:
+                    f.write(chunk.encode("UTF-8") if isinstance(chunk, str) else chunk)
+    except BaseException:
+        os.close(fd)
+        os.remove(temp)
+        raise
+    return temp, fd
+
+
+def write_atomic(path, data, fsync=True, mode=None):
+    '''
+    write_atomic(path, data, fsync, mode) -> None
+    Replaces the file 'path' with 'data' (bytes, str written as UTF-8, or an iterable of them) so that a crash leaves either the old or the new contents:
+    the data is written to a temporary file in the same directory, flushed with fsync, renamed over 'path' with os.replace, and the directory is flushed.
+    With 'fsync' False, only the atomic rename is kept. 'mode' defaults to the permissions of the replaced file, or 0o666 minus the umask for a new one.
+    If 'path' is a symbolic link, the file it points to is replaced and the link kept.
+    '''
+    path = os.path.realpath(path)
+    temp, fd = _write_temp(path, data, mode)
+    try:
+        try:
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+    if fsync:
+        fsync_directory(os.path.dirname(path))
+
+
+class AtomicBatch(object):
+    '''
+    AtomicBatch(use_syncfs=True) -> AtomicBatch object
+    Group commit for many atomic writes: write() stages each file in a temporary file without flushing it,
+    and commit() makes them all durable at once, then renames each over its target and flushes each affected directory once.
+    With 'use_syncfs' True on Linux, the staged data and the directories are flushed with one syncfs(2) per file system instead of an fsync per file.
+    Used as a context manager, the batch is committed on success and discarded if an exception is raised; every file is atomically replaced, but not the batch as a whole.
+    '''
+
+    def __init__(self, use_syncfs=True):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.use_syncfs = use_syncfs
+        self.__staged = []
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def __len__(self):
+        '''
+        Return len(self), the number of staged files.
+        '''
+        return len(self.__staged)
+
+    def write(self, path, data, mode=None):
+        '''
+        ab.write(path, data, mode) -> None
+        Stages 'data' to replace the file 'path' on commit. See write_atomic() for 'path', 'data' and 'mode'.
+        '''
+        path = os.path.realpath(path)
+        temp, fd = _write_temp(path, data, mode)
+        try:
+            device = os.fstat(fd).st_dev
+        finally:
+            # staged files are not kept open, so a large batch does not run out of descriptors
+            os.close(fd)
+        with self.__lock:
+            self.__staged.append((temp, path, device))
+
+    def commit(self):
+        '''
+        ab.commit() -> None
+        Flushes the staged files, renames them over their targets and flushes the affected directories.
+        '''
+        with self.__lock:
+            staged, self.__staged = self.__staged, []
+        if not staged:
+            return
+        try:
+            synced = set()
+            for temp, path, device in staged:
+                if device in synced:
+                    continue
+                if self.use_syncfs and _syncfs(temp):
+                    synced.add(device)
+                else:
+                    fd = os.open(temp, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+        except BaseException:
+            self.__discard(staged)
+            raise
+        directories = {}
+        replaced = 0
+        try:
+            for temp, path, device in staged:
+                os.replace(temp, path)
+                replaced += 1
+                directories[os.path.dirname(path)] = device
+        finally:
+            # a failed rename leaves its own and the following staged files behind
+            self.__discard(staged[replaced:])
+        flushed = set()
+        for directory, device in directories.items():
+            if device not in synced:
+                fsync_directory(directory)
+            elif device not in flushed:
+                # one syncfs flushes every renamed directory of the file system
+                _syncfs(directory)
+                flushed.add(device)
+
+    def abort(self):
+        '''
+        ab.abort() -> None
+        Discards the staged files, leaving their targets untouched.
+        '''
+        with self.__lock:
+            staged, self.__staged = self.__staged, []
+        self.__discard(staged)
+
+    @staticmethod
+    def __discard(staged):
+        for temp, path, device in staged:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+
+
+def replace_file(source, target, backup=None):
+    '''
+    replace_file(source, target, backup) -> None
+    Atomically replaces the file 'target' with 'source', which disappears; if 'backup' is given, the replaced contents are kept there.
+    The backup is a hard link made before the rename, so 'target' always exists with either its old or its new contents.
+    Across file systems, 'source' is first copied and flushed next to 'target'. If 'target' is a symbolic link, the file it points to is replaced.
+    '''
+    target = os.path.realpath(target)
+    if backup is not None:
+        try:
+            os.link(target, backup)
+        except OSError as err:
+            if err.errno == errno.EEXIST:
+                raise
+            # no hard links here (or another file system): a copy keeps the old contents just the same
+            shutil.copy2(target, backup)
+    try:
+        _replace(source, target)
+    except BaseException:
+        if backup is not None:
+            os.remove(backup)
+        raise
+    fsync_directory(os.path.dirname(target))
+
+
+def _replace(source, target):
+    # the data is made durable before the rename, or a crash could leave 'target' renamed but empty
+    fd = os.open(source, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    try:
+        os.replace(source, target)
+    except OSError as err:
+        if err.errno != errno.EXDEV:
+            raise
+        directory, name = os.path.split(target)
+        fd, temp = tempfile.mkstemp(prefix=".%s." % name, suffix=".tmp", dir=directory)
+        try:
+            with open(fd, 'wb') as fdst, open(source, 'rb') as fsrc:
+                shutil.copyfileobj(fsrc, fdst)
+                fdst.flush()
+                os.fsync(fdst.fileno())
+            shutil.copystat(source, temp)
+            os.replace(temp, target)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        os.remove(source)
@@ -0,0 +1,9 @@
+'''
+    Benchmark suite for fileinfo
+    Run it with "python -m pyfileinfo.benchmark --help".
+'''
+from .trees import SHAPES, generate_tree
+from .suite import BENCHMARKS, Benchmark, run_benchmarks, compare_results, load_results, save_results
+
+__all__ = ["SHAPES", "generate_tree", "BENCHMARKS", "Benchmark", "run_benchmarks",
+           "compare_results", "load_results", "save_results"]
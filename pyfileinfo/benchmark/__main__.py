@@ -0,0 +1,46 @@
+'''
+    Command line entry point of the fileinfo benchmark suite
+'''
+import sys
+import argparse
+from .suite import BENCHMARKS, run_benchmarks, compare_results, load_results, save_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyfileinfo.benchmark",
+        description="Times the FileInfo hot paths on synthetic trees and reports the results as JSON.")
+    parser.add_argument("select", nargs="*",
+                        help="run only the benchmarks whose name contains one of these strings")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file receiving the JSON results (defaults to the standard output)")
+    parser.add_argument("-b", "--baseline",
+                        help="JSON results of a previous run; exits with status 1 if a benchmark regressed")
+    parser.add_argument("-t", "--threshold", type=float, default=0.10,
+                        help="slowdown of the median tolerated against the baseline (defaults to 0.10)")
+    parser.add_argument("-s", "--scale", type=int, default=1, help="multiplies the size of the trees")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="repetitions of each benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the tree contents")
+    parser.add_argument("--workdir", help="directory receiving the trees (defaults to a temporary one)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print(benchmark.name)
+        return 0
+    if args.repeat < 1 or args.scale < 1:
+        parser.error("--repeat and --scale must be at least 1")
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_benchmarks(args.select, args.scale, args.repeat, args.seed, args.workdir, log)
+    save_results(results, args.output)
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            log("REGRESSION %(name)s: %(baseline).6fs -> %(current).6fs (%(change)+.1f%%), %(syscalls_change)+i calls" % dict(
+                regression, change=regression["change"] * 100))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+'''
+   Benchmarks of the FileInfo hot paths
+'''
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+from .trees import generate_tree
+from ..fileinfo import FileInfo, DirectorySearchOption
+from ..instrumentation import Instrumentation
+
+FORMAT_VERSION = 2
+
+
+def _read_proc_io():
+    '''
+    Returns the read and write system calls made so far by the whole process, from /proc/self/io (None where unavailable).
+    They include the calls made in C that the instrumentation does not see, such as os.DirEntry.stat.
+    '''
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f) if key in ("syscr", "syscw")}
+    except (OSError, ValueError):
+        return None
+
+
+class Benchmark(object):
+    '''
+    Benchmark(name, shape, run, setup=None, prepare=None) -> Benchmark object
+    A timed operation on the synthetic tree 'shape'. 'prepare(context)' runs once per suite run and 'setup(context)' before every repetition,
+    both untimed; 'run(context)' is the timed operation. 'context' is a dict holding "tree" (the tree root) and "work" (a scratch directory).
+    '''
+
+    def __init__(self, name, shape, run, setup=None, prepare=None):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.name = name
+        self.shape = shape
+        self.run = run
+        self.setup = setup
+        self.prepare = prepare
+
+
+def _count(iterator):
+    return sum(1 for _ in iterator)
+
+
+def _clear(context, name="dest"):
+    path = os.path.join(context["work"], name)
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+    context[name] = path
+
+
+def _copy_reference(context):
+    context["reference"] = os.path.join(context["work"], "reference")
+    if os.path.isdir(context["tree"]):
+        shutil.copytree(context["tree"], context["reference"], symlinks=True)
+
+
+def _copy_victim(context):
+    _clear(context, "victim")
+    shutil.copytree(context["tree"], context["victim"], symlinks=True)
+
+
+def _list_paths(context):
+    context["paths"] = [entry.path for entry in os.scandir(context["tree"])]
+
+
+def _read_properties(context):
+    for path in context["paths"]:
+        fi = FileInfo(path)
+        fi.length
+        fi.last_write_time
+        fi.is_read_only
+        fi.full_path
+        fi.name
+        fi.extension
+
+
+_TOP = DirectorySearchOption.TOP_DIRECTORY_ONLY
+_ALL = DirectorySearchOption.ALL_DIRECTORIES
+
+BENCHMARKS = [
+    Benchmark("iter_files_top/wide", "wide", lambda c: _count(FileInfo(c["tree"]).iter_files("*", _TOP))),
+    Benchmark("iter_items_top/wide", "wide", lambda c: _count(FileInfo(c["tree"]).iter_items("*", _TOP))),
+    Benchmark("iter_files_all/tiny", "tiny", lambda c: _count(FileInfo(c["tree"]).iter_files("*", _ALL))),
+    Benchmark("iter_items_all/tiny", "tiny", lambda c: _count(FileInfo(c["tree"]).iter_items("*", _ALL))),
+    Benchmark("iter_files_all_glob/tiny", "tiny", lambda c: _count(FileInfo(c["tree"]).iter_files("*.log", _ALL))),
+    Benchmark("iter_items_all/deep", "deep", lambda c: _count(FileInfo(c["tree"]).iter_items("*", _ALL))),
+    Benchmark("iter_items_all/symlinks", "symlinks", lambda c: _count(FileInfo(c["tree"]).iter_items("*", _ALL))),
+    Benchmark("get_directory_length/tiny", "tiny", lambda c: FileInfo(c["tree"]).get_directory_length(_ALL)),
+    Benchmark("get_directory_length/sparse", "sparse", lambda c: FileInfo(c["tree"]).get_directory_length(_ALL, allocated=True)),
+    Benchmark("copy_to_file/huge", "huge", lambda c: FileInfo(os.path.join(c["tree"], "huge0.bin")).copy_to(c["dest"]),
+              setup=_clear),
+    Benchmark("copy_to_file/sparse", "sparse", lambda c: FileInfo(os.path.join(c["tree"], "sparse0.img")).copy_to(c["dest"]),
+              setup=_clear),
+    Benchmark("copy_to_tree/tiny", "tiny", lambda c: FileInfo(c["tree"]).copy_to(c["dest"]), setup=_clear),
+    Benchmark("compare_with/tiny", "tiny", lambda c: FileInfo(c["tree"]).compare_with(c["reference"], shallow=False),
+              prepare=_copy_reference),
+    Benchmark("compare_with_file/huge", "huge",
+              lambda c: FileInfo(os.path.join(c["tree"], "huge0.bin")).compare_with(os.path.join(c["tree"], "huge1.bin"), shallow=False)),
+    Benchmark("delete_tree/tiny", "tiny", lambda c: FileInfo(c["victim"]).delete_tree(), setup=_copy_victim),
+    Benchmark("properties/wide", "wide", _read_properties, prepare=_list_paths),
+]
+
+
+def _stats(times):
+    ordered = sorted(times)
+    middle = len(ordered) // 2
+    median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return {"times": times, "min": ordered[0], "median": median, "mean": sum(times) / len(times)}
+
+
+def run_benchmarks(select=None, scale=1, repeat=5, seed=0, workdir=None, log=None, warmup=1):
+    '''
+    run_benchmarks(select, scale, repeat, seed, workdir, log, warmup) -> dict
+    Generates the synthetic trees under 'workdir' (defaults to a temporary directory, removed afterwards) and times every benchmark
+    whose name contains one of the strings in 'select' (defaults to None, all of them) 'repeat' times, after 'warmup' untimed runs
+    that fill the caches (page cache, resolved paths, compiled patterns), so the counted calls do not depend on what ran before.
+    Returns a JSON-serializable dict with the environment and, per benchmark, the times in seconds (min, median, mean)
+    and the file system calls counted by an Instrumentation during an extra, untimed repetition. 'log', if given, is called with a line of progress per benchmark.
+    '''
+    from .. import __version__
+    selected = [b for b in BENCHMARKS if not select or any(s in b.name for s in select)]
+    cleanup = workdir is None
+    workdir = tempfile.mkdtemp(prefix="pyfileinfo-bench-") if cleanup else workdir
+    results = {}
+    trees = {}
+    try:
+        for benchmark in selected:
+            if benchmark.shape not in trees:
+                trees[benchmark.shape] = generate_tree(
+                    os.path.join(workdir, "tree-" + benchmark.shape), benchmark.shape, scale, seed)
+            work = os.path.join(workdir, "work")
+            if os.path.exists(work):
+                shutil.rmtree(work)
+            os.mkdir(work)
+            context = {"tree": trees[benchmark.shape], "work": work}
+            if benchmark.prepare is not None:
+                benchmark.prepare(context)
+            times = []
+            for _ in range(warmup):
+                if benchmark.setup is not None:
+                    benchmark.setup(context)
+                benchmark.run(context)
+            for _ in range(repeat):
+                if benchmark.setup is not None:
+                    benchmark.setup(context)
+                gc.collect()
+                gc.disable()
+                try:
+                    start = time.perf_counter()
+                    benchmark.run(context)
+                    times.append(time.perf_counter() - start)
+                finally:
+                    gc.enable()
+            # the calls are counted on a separate run, so the instrumentation overhead stays out of the times
+            if benchmark.setup is not None:
+                benchmark.setup(context)
+            before = _read_proc_io()
+            with Instrumentation() as instrumentation:
+                benchmark.run(context)
+            after = _read_proc_io()
+            calls = instrumentation.call_counts()
+            methods = {}
+            for (method, call), (count, seconds) in instrumentation.calls().items():
+                methods.setdefault(method, {})[call] = count
+            result = _stats(times)
+            result.update(shape=benchmark.shape, syscalls=dict(sorted(calls.items())), syscalls_total=sum(calls.values()),
+                          syscalls_by_method=methods,
+                          kernel={key: after[key] - before[key] for key in after} if before and after else {})
+            results[benchmark.name] = result
+            if log is not None:
+                log("%-32s median %9.3f ms  min %9.3f ms  %7i calls" % (
+                    benchmark.name, result["median"] * 1000, result["min"] * 1000, result["syscalls_total"]))
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {"format": FORMAT_VERSION, "pyfileinfo": __version__, "python": platform.python_version(),
+            "implementation": platform.python_implementation(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "scale": scale, "repeat": repeat, "seed": seed, "benchmarks": results}
+
+
+def compare_results(current, baseline, threshold=0.10):
+    '''
+    compare_results(current, baseline, threshold) -> list of dict
+    Compares two results of run_benchmarks(), returning the benchmarks present in both that regressed:
+    median time more than 'threshold' (a fraction, defaults to 0.10) slower, or more system calls.
+    Calls are only compared between results of the same format, which count them the same way.
+    '''
+    same_format = current.get("format") == baseline.get("format")
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        change = (result["median"] - before["median"]) / before["median"] if before["median"] else 0.0
+        calls = result["syscalls_total"] - before["syscalls_total"] if same_format else 0
+        if change > threshold or calls > 0:
+            regressions.append({"name": name, "baseline": before["median"], "current": result["median"],
+                                "change": change, "syscalls_change": calls})
+    return regressions
+
+
+def load_results(path):
+    '''
+    load_results(path) -> dict
+    Reads results written by save_results().
+    '''
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    '''
+    save_results(results, path) -> None
+    Writes results of run_benchmarks() as JSON to 'path' ("-" for the standard output).
+    '''
+    if path == "-":
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,103 @@
+'''
+   Synthetic directory trees for the FileInfo benchmarks
+'''
+
+import os
+import random
+
+SHAPES = ("wide", "deep", "tiny", "huge", "sparse", "symlinks")
+
+_MB = 1024 * 1024
+
+
+def _random_bytes(rng, size):
+    return rng.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+
+def _write(path, size, rng):
+    # large files repeat a random block: the benchmarks measure I/O, not compressibility
+    block = _random_bytes(rng, min(size, 64 * 1024))
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+
+def _wide(root, scale, rng):
+    for i in range(5000 * scale):
+        _write(os.path.join(root, "file%06i.dat" % i), rng.randint(0, 64), rng)
+
+
+def _deep(root, scale, rng):
+    path = root
+    # one-letter names keep the deepest path within PATH_MAX at any reasonable scale
+    for depth in range(min(200 * scale, 1000)):
+        path = os.path.join(path, "d")
+        os.mkdir(path)
+        for i in range(2):
+            _write(os.path.join(path, "f%i.txt" % i), rng.randint(1, 128), rng)
+
+
+def _tiny(root, scale, rng):
+    for i in range(20 * scale):
+        top = os.path.join(root, "dir%03i" % i)
+        os.mkdir(top)
+        for j in range(10):
+            sub = os.path.join(top, "sub%02i" % j)
+            os.mkdir(sub)
+            for k in range(25):
+                _write(os.path.join(sub, "f%02i.%s" % (k, rng.choice(("log", "txt", "dat")))), rng.randint(1, 512), rng)
+
+
+def _huge(root, scale, rng):
+    for i in range(2):
+        _write(os.path.join(root, "huge%i.bin" % i), 16 * _MB * scale, rng)
+
+
+def _sparse(root, scale, rng):
+    for i in range(4):
+        with open(os.path.join(root, "sparse%i.img" % i), 'wb') as f:
+            size = 256 * _MB * scale
+            for offset in (0, size // 3, size - 4096):
+                f.seek(offset)
+                f.write(_random_bytes(rng, 4096))
+            f.truncate(size)
+
+
+def _symlinks(root, scale, rng):
+    files = os.path.join(root, "files")
+    links = os.path.join(root, "links")
+    os.mkdir(files)
+    os.mkdir(links)
+    targets = []
+    for i in range(50 * scale):
+        directory = os.path.join(files, "d%03i" % i)
+        os.mkdir(directory)
+        targets.append(directory)
+        for j in range(10):
+            path = os.path.join(directory, "f%02i" % j)
+            _write(path, rng.randint(1, 256), rng)
+            targets.append(path)
+    for i in range(len(targets)):
+        os.symlink(os.path.relpath(rng.choice(targets), links), os.path.join(links, "l%05i" % i))
+    for i in range(20 * scale):
+        os.symlink(os.path.join(files, "missing%i" % i), os.path.join(links, "dangling%03i" % i))
+
+
+_GENERATORS = {"wide": _wide, "deep": _deep, "tiny": _tiny, "huge": _huge, "sparse": _sparse, "symlinks": _symlinks}
+
+
+def generate_tree(root, shape, scale=1, seed=0):
+    '''
+    generate_tree(root, shape, scale, seed) -> str
+    Creates the synthetic tree 'shape' in the new directory 'root' and returns 'root'. 'shape' is one of:
+    "wide" (5000 files in one directory), "deep" (a chain of 200 directories, at most 1000), "tiny" (5000 small files in 200 directories),
+    "huge" (two 16 MB files), "sparse" (four 256 MB files with 12 KB of data) or "symlinks" (links to files and directories, some dangling).
+    Counts and sizes are multiplied by 'scale'; the contents depend only on 'seed', so runs are reproducible.
+    '''
+    if shape not in SHAPES:
+        raise ValueError("'shape' should be one of %s" % ", ".join(SHAPES))
+    os.makedirs(root)
+    _GENERATORS[shape](root, scale, random.Random("%s-%i" % (shape, seed)))
+    return root
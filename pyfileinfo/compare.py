@@ -0,0 +1,207 @@
+'''
+   File and directory tree comparison for FileInfo class
+'''
+
+import os
+import stat
+from collections import deque
+from .walker import scan_directory, directory_key
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ComparisonResult(object):
+    '''
+    ComparisonResult() -> ComparisonResult object
+    Result of a comparison, holding sorted lists of relative paths:
+    'equal' (same contents), 'differ' (different contents or types), 'left_only', 'right_only'
+    and 'errors' (entries that could not be compared).
+    The result is true when both sides are equal.
+    '''
+
+    def __init__(self):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.equal = []
+        self.differ = []
+        self.left_only = []
+        self.right_only = []
+        self.errors = []
+
+    def __bool__(self):
+        '''
+        Returns True if there is no difference between both sides.
+        '''
+        return not (self.differ or self.left_only or self.right_only or self.errors)
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<ComparisonResult equal=%i differ=%i left_only=%i right_only=%i errors=%i>' % (
+            len(self.equal), len(self.differ), len(self.left_only), len(self.right_only), len(self.errors))
+
+    @property
+    def is_equal(self):
+        '''
+        type: bool
+        Gets a value indicating whether both sides are equal.
+        '''
+        return bool(self)
+
+    def _sort(self):
+        for paths in (self.equal, self.differ, self.left_only, self.right_only, self.errors):
+            paths.sort()
+        return self
+
+
+def compare_files(left, right, shallow=True, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False, left_stat=None, right_stat=None):
+    '''
+    compare_files(left, right, shallow, chunk_size, use_mmap) -> True if equals, False otherwise.
+    Compares two files, rejecting on size and accepting on inode identity before reading any byte.
+    If 'shallow' is True, files with the same type, size and modification time are taken as equal, like filecmp.cmp.
+    Contents are compared in chunks of 'chunk_size' bytes, read into reused buffers or, if 'use_mmap' is True, through memory maps.
+    '''
+    st1 = left_stat or os.stat(left)
+    st2 = right_stat or os.stat(right)
+    if not stat.S_ISREG(st1.st_mode) or not stat.S_ISREG(st2.st_mode):
+        return False
+    if st1.st_ino and (st1.st_dev, st1.st_ino) == (st2.st_dev, st2.st_ino):
+        return True
+    if st1.st_size != st2.st_size:
+        return False
+    if st1.st_size == 0:
+        return True
+    if shallow and st1.st_mtime == st2.st_mtime:
+        return True
+    # small files do not pay for allocating full-size buffers
+    chunk_size = min(chunk_size, st1.st_size)
+    with open(left, 'rb') as f1, open(right, 'rb') as f2:
+        if use_mmap:
+            return _compare_mapped(f1, f2, st1.st_size, chunk_size)
+        return _compare_streams(f1, f2, chunk_size)
+
+
+def _compare_streams(f1, f2, chunk_size):
+    buf1 = bytearray(chunk_size)
+    buf2 = bytearray(chunk_size)
+    view1 = memoryview(buf1)
+    view2 = memoryview(buf2)
+    while True:
+        n1 = f1.readinto(buf1)
+        n2 = f2.readinto(buf2)
+        if n1 != n2:
+            return False
+        if n1 < chunk_size:
+            return view1[:n1] == view2[:n2]
+        if buf1 != buf2:
+            return False
+
+
+def _compare_mapped(f1, f2, size, chunk_size):
+    import mmap
+    with mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ) as m1, \
+            mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ) as m2:
+        for offset in range(0, size, chunk_size):
+            if m1[offset:offset + chunk_size] != m2[offset:offset + chunk_size]:
+                return False
+    return True
+
+
+def compare_trees(left, right, shallow=True, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False, workers=None):
+    '''
+    compare_trees(left, right, shallow, chunk_size, use_mmap, workers) -> ComparisonResult object
+    Compares two directory trees recursively, including the entries present on one side only.
+    With 'workers' (defaults to None, in the calling thread), both the directory listings and the comparisons of common files
+    by compare_files() run on a pool of that many threads, so the trees are listed in parallel while files are compared.
+    Subdirectories that can't be listed on either side are reported in 'errors'.
+    Symbolic links to directories are followed, but each pair of directories is compared once, so a link cycle present on both sides ends.
+    '''
+    result = ComparisonResult()
+    executor = None
+    if workers and workers > 1:
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        executor = ThreadPoolExecutor(workers)
+    jobs = []
+    try:
+        pending = deque([""])
+        running = {}
+        lroot = os.stat(left)
+        rroot = os.stat(right)
+        visited = {((lroot.st_dev, lroot.st_ino), (rroot.st_dev, rroot.st_ino))}
+        while pending or running:
+            if executor is not None:
+                while pending:
+                    relative = pending.popleft()
+                    running[executor.submit(_scan_pair, left, right, relative)] = relative
+                done = next(iter(wait(running, return_when=FIRST_COMPLETED).done))
+                relative = running.pop(done)
+                listing = done.result()
+            else:
+                relative = pending.pop()
+                listing = _scan_pair(left, right, relative)
+            if isinstance(listing, OSError):
+                if not relative:
+                    raise listing
+                result.errors.append(relative)
+                continue
+            lentries, rentries = listing
+            for name in lentries.keys() | rentries.keys():
+                path = os.path.join(relative, name)
+                lentry = lentries.get(name)
+                rentry = rentries.get(name)
+                if rentry is None:
+                    result.left_only.append(path)
+                elif lentry is None:
+                    result.right_only.append(path)
+                elif lentry.is_dir() and rentry.is_dir():
+                    key = (directory_key(lentry), directory_key(rentry))
+                    if None in key:
+                        result.errors.append(path)
+                    elif key not in visited:
+                        visited.add(key)
+                        pending.append(path)
+                elif lentry.is_file() and rentry.is_file():
+                    args = (lentry, rentry, shallow, chunk_size, use_mmap)
+                    if executor is None:
+                        jobs.append((path, _compare_entries(*args)))
+                    else:
+                        jobs.append((path, executor.submit(_compare_entries, *args)))
+                elif lentry.is_dir() or rentry.is_dir() or lentry.is_file() or rentry.is_file():
+                    result.differ.append(path)
+                else:
+                    result.errors.append(path)
+        for path, outcome in jobs:
+            if executor is not None:
+                outcome = outcome.result()
+            if outcome is None:
+                result.errors.append(path)
+            elif outcome:
+                result.equal.append(path)
+            else:
+                result.differ.append(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return result._sort()
+
+
+def _scan_pair(left, right, relative):
+    '''
+    Lists the directory 'relative' on both sides, returning the entries of each keyed by name, or the OSError raised.
+    '''
+    try:
+        # the directories are stat'ed by the listing worker, for their keys
+        return ({e.name: e for e in scan_directory(os.path.join(left, relative), stat_directories=True)},
+                {e.name: e for e in scan_directory(os.path.join(right, relative), stat_directories=True)})
+    except OSError as err:
+        return err
+
+
+def _compare_entries(lentry, rentry, shallow, chunk_size, use_mmap):
+    try:
+        return compare_files(lentry.path, rentry.path, shallow, chunk_size, use_mmap,
+                             lentry.stat(), rentry.stat())
+    except OSError:
+        return None
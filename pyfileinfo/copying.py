@@ -0,0 +1,271 @@
+'''
+   File copy engine for FileInfo class
+'''
+
+import os
+import sys
+import stat
+import errno
+import shutil
+from collections import namedtuple
+from .walker import scan_directory
+from .hashing import hash_file
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# larger requests let the kernel copy more per syscall in copy_file_range/sendfile
+KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+
+FICLONE = 0x40049409
+
+METHOD_REFLINK = "reflink"
+METHOD_COPY_FILE_RANGE = "copy_file_range"
+METHOD_SENDFILE = "sendfile"
+METHOD_BUFFERED = "buffered"
+
+# errors meaning "this method does not work for these files", after which the next one is tried
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                errno.ENOTTY, errno.EBADF, errno.EPERM, errno.ETXTBSY}
+if hasattr(errno, "ENOTSUP"):
+    _UNSUPPORTED.add(errno.ENOTSUP)
+
+
+class _Fallback(Exception):
+    '''
+    Raised by a copy method that copied nothing, so the next method is tried.
+    '''
+
+
+def _reflink(infd, outfd, size, progress):
+    import fcntl
+    fcntl.ioctl(outfd, FICLONE, infd)
+    if progress is not None:
+        progress(size, size, METHOD_REFLINK)
+
+
+def _kernel_copy(copy, method):
+    def copy_range(infd, outfd, size, progress):
+        # copies up to the end of the file, not to 'size': the file may grow, and /proc files report a size of 0
+        copied = 0
+        while True:
+            sent = copy(infd, outfd, copied, KERNEL_CHUNK_SIZE)
+            if not sent:
+                if not copied:
+                    # some file systems answer 0 without copying anything (like shutil, leave them to the next method)
+                    raise _Fallback()
+                break
+            copied += sent
+            if progress is not None:
+                progress(copied, max(size, copied), method)
+    return copy_range
+
+
+def _buffered(infd, outfd, size, progress, chunk_size=DEFAULT_CHUNK_SIZE):
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    copied = 0
+    with open(infd, 'rb', buffering=0, closefd=False) as fsrc:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            written = 0
+            while written < n:
+                written += os.write(outfd, view[written:n])
+            copied += n
+            if progress is not None:
+                progress(copied, size, METHOD_BUFFERED)
+
+
+def _methods():
+    methods = []
+    if sys.platform.startswith("linux"):
+        methods.append((METHOD_REFLINK, _reflink))
+        if hasattr(os, "copy_file_range"):
+            methods.append((METHOD_COPY_FILE_RANGE, _kernel_copy(
+                lambda infd, outfd, offset, count: os.copy_file_range(infd, outfd, count, offset, offset),
+                METHOD_COPY_FILE_RANGE)))
+        if hasattr(os, "sendfile"):
+            methods.append((METHOD_SENDFILE, _kernel_copy(
+                lambda infd, outfd, offset, count: os.sendfile(outfd, infd, offset, count),
+                METHOD_SENDFILE)))
+    methods.append((METHOD_BUFFERED, _buffered))
+    return methods
+
+
+_METHODS = _methods()
+
+
+def copy_file(src, dst, progress=None):
+    '''
+    copy_file(src, dst, progress) -> str
+    Copies the contents of the file 'src' to 'dst', trying the cheapest method first:
+    a reflink clone (btrfs, XFS), os.copy_file_range, os.sendfile and, when none of them works, a buffered copy.
+    Returns the name of the method used: "reflink", "copy_file_range", "sendfile" or "buffered".
+    'progress', if given, is called as progress(copied, total, method) while the data is copied.
+    Raises shutil.SpecialFileError if 'src' is not a regular file (a named pipe, a socket or a device).
+    '''
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError("%r and %r are the same file" % (src, dst))
+    # opened without blocking, so a named pipe is reported instead of waiting for a writer
+    infd = os.open(src, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0))
+    try:
+        st = os.fstat(infd)
+        if not stat.S_ISREG(st.st_mode):
+            raise shutil.SpecialFileError("'%s' is not a regular file" % src)
+        if hasattr(os, "set_blocking"):
+            os.set_blocking(infd, True)
+        fsrc = open(infd, 'rb', buffering=0)
+    except BaseException:
+        os.close(infd)
+        raise
+    with fsrc, open(dst, 'wb', buffering=0) as fdst:
+        outfd = fdst.fileno()
+        size = st.st_size
+        for method, copy in _METHODS:
+            try:
+                copy(infd, outfd, size, progress)
+                return method
+            except (OSError, _Fallback) as err:
+                if method == METHOD_BUFFERED or (isinstance(err, OSError) and err.errno not in _UNSUPPORTED):
+                    raise
+                # a failed attempt may have written part of the data
+                os.ftruncate(outfd, 0)
+                os.lseek(outfd, 0, os.SEEK_SET)
+                os.lseek(infd, 0, os.SEEK_SET)
+
+
+def copy_file_with_metadata(src, dst, progress=None):
+    '''
+    copy_file_with_metadata(src, dst, progress) -> str
+    Same as copy_file(), also copying the permission bits and times like shutil.copy2.
+    Suitable as 'copy_function' of shutil.copytree.
+    '''
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    method = copy_file(src, dst, progress)
+    shutil.copystat(src, dst)
+    return method
+
+
+def copy_tree(src, dst, progress=None):
+    '''
+    copy_tree(src, dst, progress) -> None
+    Copies the directory tree 'src' to the new directory 'dst' with shutil.copytree, copying every file through copy_file_with_metadata().
+    'progress', if given, is called as progress(copied, total, method) for each file copied.
+    '''
+    shutil.copytree(src, dst, copy_function=lambda s, d: copy_file_with_metadata(s, d, progress))
+
+
+SyncSummary = namedtuple(
+    "SyncSummary", "files_copied bytes_copied files_skipped bytes_skipped deleted errors")
+SyncSummary.__doc__ = '''
+    SyncSummary(files_copied, bytes_copied, files_skipped, bytes_skipped, deleted, errors)
+    Totals of a sync_tree() run; 'deleted' counts the extraneous destination entries removed,
+    and 'errors' lists the entries that could not be synced as (source, destination, reason) tuples, like shutil.Error.
+    '''
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _sync_file(src, dst, target, use_hash, progress):
+    '''
+    Copies the os.DirEntry 'src' to the path 'target', unless the os.DirEntry 'dst' found there already matches it.
+    Returns a tuple (copied, size).
+    '''
+    st = src.stat()
+    if dst is not None:
+        if dst.is_dir():
+            _remove(dst.path)
+        else:
+            dst_st = dst.stat()
+            if dst_st.st_size == st.st_size:
+                if st.st_mtime_ns == dst_st.st_mtime_ns:
+                    return False, st.st_size
+                if use_hash and hash_file(src.path) == hash_file(dst.path):
+                    # keeps the times in step, so the next run does not hash it again
+                    shutil.copystat(src.path, dst.path)
+                    return False, st.st_size
+    copy_file_with_metadata(src.path, target, progress)
+    return True, st.st_size
+
+
+def sync_tree(src, dst, use_hash=False, delete=False, workers=4, progress=None):
+    '''
+    sync_tree(src, dst, use_hash, delete, workers, progress) -> SyncSummary
+    Updates the directory tree 'dst' to match 'src', copying only the files whose size or modification time differ
+    (or, if 'use_hash' is True, whose contents differ when the sizes match).
+    Files are compared and copied on a pool of 'workers' threads. If 'delete' is True, destination entries missing from 'src' are removed.
+    'progress', if given, is called as progress(copied, total, method) for each file copied.
+    Entries that fail, and source entries that are neither regular files nor directories (named pipes, sockets, dangling links),
+    are reported in the 'errors' of the summary while the rest of the tree is synced; only a failure on 'dst' itself is raised.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    jobs = []
+    directories = []
+    errors = []
+    deleted = 0
+    with ThreadPoolExecutor(workers) as executor:
+        pending = [(src, dst)]
+        while pending:
+            source, target = pending.pop()
+            try:
+                if os.path.isdir(target):
+                    existing = {e.name: e for e in scan_directory(target)}
+                else:
+                    if os.path.lexists(target):
+                        os.remove(target)
+                    os.mkdir(target)
+                    existing = {}
+                entries = scan_directory(source)
+            except OSError as err:
+                if source == src:
+                    raise
+                errors.append((source, target, str(err)))
+                continue
+            directories.append((source, target))
+            for entry in entries:
+                current = existing.pop(entry.name, None)
+                path = os.path.join(target, entry.name)
+                try:
+                    if entry.is_dir():
+                        if current is not None and not current.is_dir():
+                            os.remove(current.path)
+                        pending.append((entry.path, path))
+                    elif entry.is_file():
+                        jobs.append((entry.path, path, executor.submit(
+                            _sync_file, entry, current, path, use_hash, progress)))
+                    else:
+                        errors.append((entry.path, path, "'%s' is not a regular file" % entry.path))
+                except OSError as err:
+                    errors.append((entry.path, path, str(err)))
+            if delete:
+                for entry in existing.values():
+                    try:
+                        _remove(entry.path)
+                        deleted += 1
+                    except OSError as err:
+                        errors.append((None, entry.path, str(err)))
+        copied = copied_bytes = skipped = skipped_bytes = 0
+        for source, target, job in jobs:
+            try:
+                done, size = job.result()
+            except (OSError, shutil.Error) as err:
+                errors.append((source, target, str(err)))
+                continue
+            if done:
+                copied += 1
+                copied_bytes += size
+            else:
+                skipped += 1
+                skipped_bytes += size
+    for source, target in reversed(directories):
+        try:
+            shutil.copystat(source, target)
+        except OSError as err:
+            errors.append((source, target, str(err)))
+    return SyncSummary(copied, copied_bytes, skipped, skipped_bytes, deleted, errors)
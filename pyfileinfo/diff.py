@@ -0,0 +1,275 @@
+'''
+   Directory tree differences for FileInfo class
+'''
+
+import os
+import stat
+import queue
+import threading
+from .snapshot import TreeSnapshot
+from .hashing import hash_file
+
+_BATCH_SIZE = 1024
+_QUEUE_DEPTH = 8
+
+
+class TreeDiff(object):
+    '''
+    TreeDiff() -> TreeDiff object
+    Differences between two directory trees, as relative paths in walk order:
+    'added', 'removed' and 'modified' entries, 'renamed' entries as (old path, new path) tuples,
+    and 'errors' (directories that could not be listed and files that could not be hashed).
+    len() is the number of changes; the result is false when both trees are the same.
+    '''
+
+    def __init__(self):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.added = []
+        self.removed = []
+        self.modified = []
+        self.renamed = []
+        self.errors = []
+
+    def __len__(self):
+        '''
+        Return len(self).
+        '''
+        return len(self.added) + len(self.removed) + len(self.modified) + len(self.renamed)
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<TreeDiff added=%i removed=%i modified=%i renamed=%i errors=%i>' % (
+            len(self.added), len(self.removed), len(self.modified), len(self.renamed), len(self.errors))
+
+
+def _list_live(root, errors):
+    def listdir(relative):
+        entries = []
+        try:
+            with os.scandir(os.path.join(root, relative)) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append((entry.name, st.st_size, st.st_mtime_ns, st.st_mode, st.st_ino, st.st_dev))
+        except OSError:
+            errors.append(relative)
+        return entries
+    return listdir
+
+
+def _list_snapshot(snapshot):
+    # snapshots record no device: their entries are taken to be on the device of the root
+    device = _root_device(snapshot)
+
+    def listdir(relative):
+        return [(os.path.basename(e.path),) + tuple(e[1:]) + (device,) for e in snapshot.entries(relative)]
+    return listdir
+
+
+def _walk_sorted(listdir):
+    '''
+    Walks a tree depth-first, each directory in name order, yielding (path, size, mtime_ns, mode, inode, device):
+    the paths come out sorted by their tuple of components, so two walks can be merged like sorted lists.
+    '''
+    stack = [("", iter(sorted(listdir(""))))]
+    while stack:
+        relative, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        path = os.path.join(relative, entry[0]) if relative else entry[0]
+        yield (path,) + entry[1:]
+        if stat.S_ISDIR(entry[3]):
+            stack.append((path, iter(sorted(listdir(path)))))
+
+
+def _prefetch(iterable):
+    '''
+    Runs 'iterable' on a background thread, a bounded number of batches ahead of the consumer.
+    '''
+    batches = queue.Queue(_QUEUE_DEPTH)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # gives up once the consumer is gone
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        batch = []
+        try:
+            for item in iterable:
+                batch.append(item)
+                if len(batch) == _BATCH_SIZE:
+                    if not put(batch):
+                        return
+                    batch = []
+            put(batch) and put(done)
+        except BaseException as err:
+            put(err)
+
+    thread = threading.Thread(target=produce, name="diff_walk", daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is done:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            for item in batch:
+                yield item
+    finally:
+        stop.set()
+
+
+def _merge(left, right):
+    '''
+    Merges two sorted walks, yielding (left entry or None, right entry or None) for every path.
+    '''
+    missing = object()
+    lentry = next(left, missing)
+    rentry = next(right, missing)
+    lkey = rkey = None
+    while lentry is not missing or rentry is not missing:
+        if lentry is not missing and lkey is None:
+            lkey = lentry[0].split(os.sep)
+        if rentry is not missing and rkey is None:
+            rkey = rentry[0].split(os.sep)
+        if rentry is missing or (lentry is not missing and lkey < rkey):
+            yield lentry, None
+            lentry, lkey = next(left, missing), None
+        elif lentry is missing or rkey < lkey:
+            yield None, rentry
+            rentry, rkey = next(right, missing), None
+        else:
+            yield lentry, rentry
+            lentry, lkey = next(left, missing), None
+            rentry, rkey = next(right, missing), None
+
+
+def _same_file(left, right, algorithm, cache):
+    try:
+        return hash_file(left, algorithm, cache=cache) == hash_file(right, algorithm, cache=cache)
+    except OSError:
+        return None
+
+
+def _root_device(side):
+    if isinstance(side, TreeSnapshot):
+        side = side.root
+    try:
+        return os.stat(side).st_dev
+    except OSError:
+        return None
+
+
+def diff_trees(left, right, use_hash=True, workers=4, algorithm="sha256", cache=None, detect_renames=None):
+    '''
+    diff_trees(left, right, use_hash, workers, algorithm, cache, detect_renames) -> TreeDiff object
+    Returns the changes from the tree 'left' to the tree 'right', each a directory path or a TreeSnapshot.
+    Both trees are walked concurrently in sorted order and merged, so only the current directories of each walk are held in memory.
+    Entries are modified when their type, size or modification time differ; if 'use_hash' is True, regular files of the same size
+    on two live trees are hashed on 'workers' threads to confirm the change (with 'cache', a HashCache, if given).
+    Removed and added entries sharing a device and an inode are reported as renamed when 'detect_renames' is True; it defaults to
+    True when both roots are on the same device (a snapshot counting as its root directory).
+    '''
+    result = TreeDiff()
+    if detect_renames is None:
+        device = _root_device(left)
+        detect_renames = device is not None and device == _root_device(right)
+    sides = []
+    for side in (left, right):
+        if isinstance(side, TreeSnapshot):
+            sides.append((None, _list_snapshot(side)))
+        else:
+            sides.append((side, _list_live(side, result.errors)))
+    (lroot, llist), (rroot, rlist) = sides
+    confirm = use_hash and lroot is not None and rroot is not None
+    executor = None
+    if confirm:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(workers or 1)
+    modified = []
+    removed = {}
+    added = {}
+    try:
+        for lentry, rentry in _merge(_prefetch(_walk_sorted(llist)), _prefetch(_walk_sorted(rlist))):
+            if rentry is None:
+                result.removed.append(lentry[0])
+                if detect_renames and lentry[4]:
+                    removed[lentry[5], lentry[4]] = lentry
+            elif lentry is None:
+                result.added.append(rentry[0])
+                if detect_renames and rentry[4]:
+                    added.setdefault((rentry[5], rentry[4]), rentry)
+            else:
+                path, lsize, lmtime, lmode = lentry[:4]
+                rsize, rmtime, rmode = rentry[1:4]
+                if stat.S_IFMT(lmode) != stat.S_IFMT(rmode):
+                    modified.append((path, True))
+                elif stat.S_ISDIR(lmode) or (lsize == rsize and lmtime == rmtime):
+                    continue
+                elif lsize != rsize or not confirm or not stat.S_ISREG(lmode):
+                    modified.append((path, True))
+                else:
+                    modified.append((path, executor.submit(
+                        _same_file, os.path.join(lroot, path), os.path.join(rroot, path), algorithm, cache)))
+        for path, outcome in modified:
+            if outcome is not True:
+                same = outcome.result()
+                if same is None:
+                    result.errors.append(path)
+                    continue
+                if same:
+                    continue
+            result.modified.append(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if removed and added:
+        _pair_renames(result, removed, added)
+    return result
+
+
+def _pair_renames(result, removed, added):
+    '''
+    Moves the removed and added entries sharing a device, an inode and a type to 'renamed'; the entries below a renamed directory,
+    which are renamed along with it, are dropped, and reported as modified if their metadata changed.
+    '''
+    renamed = []
+    for key, lentry in removed.items():
+        rentry = added.get(key)
+        if rentry is not None and stat.S_IFMT(lentry[3]) == stat.S_IFMT(rentry[3]):
+            renamed.append((lentry, rentry))
+    if not renamed:
+        return
+    directories = [(os.path.join(l[0], ""), os.path.join(r[0], "")) for l, r in renamed if stat.S_ISDIR(l[3])]
+    gone = set()
+    moved = []
+    for lentry, rentry in renamed:
+        old, new = lentry[0], rentry[0]
+        gone.add(old)
+        gone.add(new)
+        parent = next((d for d in directories if old.startswith(d[0]) and new.startswith(d[1])), None)
+        if parent is not None and old[len(parent[0]):] == new[len(parent[1]):]:
+            if lentry[1:4] != rentry[1:4] and not stat.S_ISDIR(lentry[3]):
+                result.modified.append(new)
+            continue
+        moved.append((old, new))
+    result.removed = [path for path in result.removed if path not in gone]
+    result.added = [path for path in result.added if path not in gone]
+    result.renamed = moved
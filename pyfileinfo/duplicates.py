@@ -0,0 +1,98 @@
+'''
+   Duplicate file detection for FileInfo class
+'''
+
+import os
+from collections import defaultdict
+from .walker import iter_entries
+from .hashing import hash_stream, hash_file, DEFAULT_CHUNK_SIZE
+
+DEFAULT_PARTIAL_SIZE = 8 * 1024
+
+
+def _identity(entry):
+    st = entry.stat()
+    if not st.st_ino:
+        # directory entries carry no inode number on Windows
+        st = os.stat(entry.path)
+    return st.st_dev, st.st_ino
+
+
+def _partial_hash(path, size, algorithm, partial_size):
+    with open(path, 'rb', buffering=0) as f:
+        digest = hash_stream(f, algorithm, partial_size, partial_size)
+        if size > partial_size:
+            f.seek(max(partial_size, size - partial_size))
+            digest.update(hash_stream(f, algorithm, partial_size, partial_size).digest())
+    return digest.hexdigest()
+
+
+def _split(groups, key, executor):
+    '''
+    Splits every group of paths by the value of key(path), computed on the executor, dropping the singletons.
+    '''
+    paths = [path for group in groups for path in group]
+    keys = dict(zip(paths, executor.map(key, paths)))
+    result = []
+    for group in groups:
+        buckets = defaultdict(list)
+        for path in group:
+            if keys[path] is not None:
+                buckets[keys[path]].append(path)
+        result.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return result
+
+
+def find_duplicates(path, recursive=True, match=None, min_size=1, algorithm="sha256", partial_size=DEFAULT_PARTIAL_SIZE, workers=4, cache=None):
+    '''
+    find_duplicates(path, recursive, match, min_size, algorithm, partial_size, workers, cache) -> list of lists of paths
+    Returns the groups of files with identical contents in the directory 'path', narrowing the candidates in stages:
+    files are grouped by size, then by a hash of their first and last 'partial_size' bytes, and only the groups that still collide are fully hashed.
+    Hard links to the same file count as a single file, listed under its first path found. Files smaller than 'min_size' bytes are skipped.
+    Hashing runs on a pool of 'workers' threads; full digests are read from and stored in 'cache', if it is a HashCache.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    by_size = defaultdict(list)
+    for entry in iter_entries(path, recursive, workers, False, prefetch_stat=True):
+        if not entry.is_file() or (match is not None and not match(entry.name)):
+            continue
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        if size >= min_size:
+            by_size[size].append(entry)
+    groups = []
+    sizes = {}
+    for size, entries in by_size.items():
+        if len(entries) < 2:
+            continue
+        files = {}
+        for entry in entries:
+            try:
+                files.setdefault(_identity(entry), entry.path)
+            except OSError:
+                pass
+        if len(files) > 1:
+            groups.append(list(files.values()))
+            sizes.update((p, size) for p in files.values())
+
+    def partial(path):
+        try:
+            return _partial_hash(path, sizes[path], algorithm, partial_size)
+        except OSError:
+            return None
+
+    def full(path):
+        try:
+            return hash_file(path, algorithm, DEFAULT_CHUNK_SIZE, cache)
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(workers) as executor:
+        groups = _split(groups, partial, executor)
+        # the partial hash already covered the whole contents of small files
+        small = [group for group in groups if sizes[group[0]] <= 2 * partial_size]
+        large = [group for group in groups if sizes[group[0]] > 2 * partial_size]
+        groups = small + _split(large, full, executor)
+    return sorted(sorted(group) for group in groups)
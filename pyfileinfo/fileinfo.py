@@ -29,45 +29,170 @@
 """
 
 import os
+import re
 import shutil
 import stat
-import fnmatch
 import datetime
+import time
 from .exceptions import *
 from .helpers import *
-
-if os.name == 'nt':
-    fnmatch.translate = translate
+from .matcher import SearchPattern, compile_search
+from . import walker
+from . import copying
+from . import hashing
+from . import removal
+from . import duplicates
+from . import streaming
+from . import atomic
+from . import statx
+from .atomic import AtomicBatch
+from .hashing import HashCache
+from .copying import SyncSummary
+from .removal import DeleteHandle
+from .fileinfoset import FileInfoSet
+from .compare import ComparisonResult, compare_files, compare_trees, DEFAULT_CHUNK_SIZE
+from .walker import DirectoryUsage
+from .resolver import resolve_entry
+from .snapshot import TreeSnapshot, SnapshotEntry
+from .watcher import DirectoryWatcher, WatchEvent
+from .statx import StatxResult
+from .diff import TreeDiff, diff_trees
+from .mapping import MappedFile
+
+_INVALID_PATH_CHARS = re.compile('[*?"<>|]')
+
+
+def _restore(cls, path, cache_stat, ttl, dont_sync):
+    # unpickles a FileInfo without validating the path again: it may come from the file system, like the walked ones
+    return cls._restore(path, cache_stat, ttl, dont_sync)
 
 
 class FileInfo(object):
     '''
-    FileInfo(path) -> FileInfo object
+    FileInfo(path, cache_stat=False, ttl=None, dont_sync=False) -> FileInfo object
     Initializes a new instance of the FileInfo class, which acts as a wrapper for a file path.
+    If 'cache_stat' is True (or a 'ttl' in seconds is given), the metadata properties are served from a single stat snapshot,
+    kept until refresh() is called, the 'ttl' expires or this object changes the file itself.
+    If 'dont_sync' is True, the metadata comes from statx(2) with AT_STATX_DONT_SYNC where available (Linux): a network file system
+    answers from its attribute cache, and each property only asks for the field it reads.
     '''
+    __slots__ = ("__path", "__entry", "__cache_stat", "__ttl", "__snapshot", "__snapshot_time",
+                 "__full_path", "__names", "__dont_sync", "__weakref__")
 
     #-------------------- Constructor ---------------------------
-    def __init__(self, path):
+    def __init__(self, path, cache_stat=False, ttl=None, dont_sync=False):
         '''
         Create and return a new object.  See help(type) for accurate signature.
         '''
         if isinstance(path, str):
             if self.__is_valid_path(path):
-                self.__path = path
+                self.__setup(path, None, cache_stat or ttl is not None, ttl)
+                self.__dont_sync = dont_sync
             else:
                 raise InvalidPathException("'%s' is not a valid path" % path)
         else:
             raise NotSupportedException("'path' should be a string or unicode")
 
+    def __setup(self, path, entry, cache_stat, ttl):
+        self.__path = path
+        self.__entry = entry
+        self.__cache_stat = cache_stat
+        self.__ttl = ttl
+        self.__snapshot = None
+        self.__snapshot_time = 0
+        self.__full_path = None
+        self.__names = None
+        self.__dont_sync = False
+
+    @classmethod
+    def _trusted(cls, path, entry=None, full_path=None):
+        '''
+        Trusted constructor for the enumeration code: wraps a path read from the file system (and its directory entry and resolved path, if known) without validating it.
+        '''
+        self = cls.__new__(cls)
+        self.__setup(path, entry, False, None)
+        self.__full_path = full_path
+        return self
+
+    def __reduce__(self):
+        '''
+        Helper for pickle: keeps the path and the options, not the directory entry or the cached stat, which can't be pickled.
+        '''
+        return (_restore, (self.__class__, self.__path, self.__cache_stat, self.__ttl, self.__dont_sync))
+
+    @classmethod
+    def _restore(cls, path, cache_stat, ttl, dont_sync):
+        self = cls.__new__(cls)
+        self.__setup(path, None, cache_stat, ttl)
+        self.__dont_sync = dont_sync
+        return self
+
     #----------------------- Methods ------------------------------
     @staticmethod
     def __is_valid_path(path):
-        for c in '*?"<>|':
-            if c in path:
-                return False
-        if ":" in path and path.rindex(":") != 1:
+        if not path or _INVALID_PATH_CHARS.search(path):
             return False
-        return bool(path)
+        colon = path.rfind(":")
+        return colon == -1 or colon == 1
+
+    def __stat(self, fields=statx.BASIC_STATS):
+        '''
+        Returns the os.stat_result of the path, reusing the stat snapshot or the cached stat of the directory entry this object was enumerated from, if any.
+        'fields' are the StatFields bits the caller reads: when statx(2) is used (for 'dont_sync', or for the birth time os.stat lacks),
+        only those are requested, or all of them if the result is kept as the snapshot; a StatxResult is then returned.
+        '''
+        birth = fields & StatFields.BTIME and statx.available()
+        if self.__snapshot is not None:
+            if self.__ttl is None or time.monotonic() - self.__snapshot_time < self.__ttl:
+                if not birth or isinstance(self.__snapshot, StatxResult):
+                    return self.__snapshot
+            else:
+                self.__snapshot = None
+        try:
+            if birth or (self.__dont_sync and self.__entry is None and statx.available()):
+                result = statx.statx(self.original_path, statx.ALL if self.__cache_stat else fields, self.__dont_sync)
+            elif self.__entry is not None:
+                result = self.__entry.stat()
+            else:
+                result = os.stat(self.original_path)
+        except OSError:
+            raise FileNotFoundException("'%s' not found" % self.original_path)
+        if self.__cache_stat:
+            self.__snapshot = result
+            self.__snapshot_time = time.monotonic()
+        return result
+
+    def stat(self, fields=statx.ALL, dont_sync=None, follow_symlinks=True):
+        '''
+        fi.stat(fields, dont_sync, follow_symlinks) -> StatxResult
+        Returns the metadata of the current directory or file, asking only for 'fields' (a combination of StatFields values, defaults to all of them),
+        including the birth time the file system records. 'dont_sync' (defaults to the one this object was created with)
+        returns the attributes a network file system has cached without revalidating them. Falls back to os.stat where statx(2) is unavailable.
+        '''
+        try:
+            return statx.statx(self.original_path, fields, self.__dont_sync if dont_sync is None else dont_sync, follow_symlinks)
+        except OSError:
+            raise FileNotFoundException("'%s' not found" % self.original_path)
+
+    def refresh(self):
+        '''
+        fi.refresh() -> None
+        Discards the cached stat and names of this instance, so the next access reads the file system again.
+        '''
+        self.__entry = None
+        self.__snapshot = None
+        self.__full_path = None
+        self.__names = None
+
+    def __name_parts(self):
+        '''
+        Returns the memoized (directory_name, name, base_name, extension) of the full path.
+        '''
+        parts = self.__names
+        if parts is None:
+            directory, name = os.path.split(self.full_path)
+            parts = self.__names = (directory, name) + os.path.splitext(name)
+        return parts
 
     def __repr__(self):
         '''
@@ -94,7 +219,7 @@ class FileInfo(object):
         Return len(self).
         '''
         if self.is_directory:
-            return self.get_directory_length()
+            return self.get_directory_usage().length
         return self.length
 
     def __str__(self):
@@ -115,32 +240,42 @@ class FileInfo(object):
         raise UnauthorizedAccessException(
             "'%s' is not a file" % self.original_path)
 
-    def copy_to(self, location, overwrite=False):
+    def copy_to(self, location, overwrite=False, progress=None, incremental=False):
         '''
-        fi.copy_to(location, overwrite) -> FileInfo object
+        fi.copy_to(location, overwrite, progress, incremental) -> FileInfo object
         Copies an existing file or directory to a new file or directory, allowing the overwriting of an existing file or directory.
         'overwrite' defaults to False.
+        Files are copied with the cheapest method available (reflink clone, copy_file_range, sendfile, then a buffered copy);
+        'progress', if given, is called as progress(copied, total, method) while each file is copied.
+        If 'incremental' is True, an existing directory is overwritten with sync_to(location, delete=True) instead of being removed and copied again.
+        Either way, the entries that could not be copied are raised together in a shutil.Error once the rest of the tree is copied.
         '''
         if os.path.exists(self.original_path):
             if not self.__is_valid_path(location):
                 raise InvalidPathException("'%s' is not valid path" % location)
             if os.path.isfile(self.original_path):
                 if (overwrite) or (not os.path.exists(location)):
-                    shutil.copyfile(self.original_path, location)
+                    copying.copy_file(self.original_path, location, progress)
                     return FileInfo(location)
                 raise FileAlreadyExistsException(
                     "'%s' already exists" % location)
             elif os.path.isdir(self.original_path):
                 if os.path.exists(location):
                     if overwrite:
+                        if incremental:
+                            summary = self.sync_to(location, delete=True, progress=progress)
+                            if summary.errors:
+                                # reported like the errors shutil.copytree collects on a full copy
+                                raise shutil.Error(summary.errors)
+                            return FileInfo(location)
                         shutil.rmtree(location)
-                        shutil.copytree(self.original_path, location)
+                        copying.copy_tree(self.original_path, location, progress)
                         return FileInfo(location)
                     else:
                         raise DirectoryAlreadyExistsException(
                             "'%s' already exists" % location)
                 else:
-                    shutil.copytree(self.original_path, location)
+                    copying.copy_tree(self.original_path, location, progress)
                     return FileInfo(location)
             else:
                 raise NotSupportedException(
@@ -149,6 +284,21 @@ class FileInfo(object):
             raise DirectoryNotFoundException(
                 "'%s' not found" % self.original_path)
 
+    def sync_to(self, location, use_hash=False, delete=False, workers=4, progress=None):
+        '''
+        fi.sync_to(location, use_hash, delete, workers, progress) -> SyncSummary object
+        Updates the directory 'location' (created if needed) to match the current directory, copying only the files that changed.
+        Files are taken as unchanged when size and modification time match or, if 'use_hash' is True, when size and contents match.
+        Changed files are copied on 'workers' threads. If 'delete' is True, entries of 'location' missing from the current directory are removed.
+        Returns the number of files and bytes copied and skipped, the number of entries deleted and the entries that failed.
+        '''
+        if not os.path.isdir(self.original_path):
+            raise NotSupportedException(
+                "'%s' is not a directory" % self.original_path)
+        if not self.__is_valid_path(location):
+            raise InvalidPathException("'%s' is not valid path" % location)
+        return copying.sync_tree(self.original_path, location, use_hash, delete, workers, progress)
+
     def create(self):
         '''
         fi.create() -> file object
@@ -209,21 +359,22 @@ class FileInfo(object):
             raise DirectoryNotFoundException(
                 "'%s' not found" % self.original_path)
 
-    def delete_tree(self, ignoreerros=False, onerror=None):
+    def delete_tree(self, ignoreerros=False, onerror=None, workers=None, detach=False):
         '''
-        fi.delete_tree() -> None
-        Permanently deletes a directory tree.
+        fi.delete_tree(ignoreerros, onerror, workers, detach) -> None or DeleteHandle object
+        Permanently deletes a directory tree, unlinking entries relative to their directory file descriptor where the platform allows it.
+        'workers' sets the number of threads clearing directories concurrently (defaults to None, single-threaded).
+        If 'detach' is True, the tree is atomically renamed to a hidden sibling name and deleted on a background thread;
+        returns a DeleteHandle whose wait() blocks until the deletion finishes.
         '''
         if os.path.exists(self.original_path):
             if os.path.isdir(self.original_path):
                 if onerror is None:
-                    def onerror(func, path, exc_info):
-                        if not os.access(path, os.W_OK):
-                            os.chmod(path, stat.S_IWUSR)
-                            func(path)
-                        else:
-                            raise
-                shutil.rmtree(self.original_path, ignoreerros, onerror)
+                    onerror = removal._default_onerror
+                self.refresh()
+                if detach:
+                    return removal.detach_tree(self.original_path, ignoreerros, onerror, workers)
+                removal.remove_tree(self.original_path, ignoreerros, onerror, workers)
             else:
                 raise NotSupportedException(
                     "'%s' can't be removed" % self.original_path)
@@ -309,6 +460,7 @@ class FileInfo(object):
                              security.st_uid, security.st_gid)
                 if information & 0x4:
                     os.chflags(self.original_path, security.st_flags)
+                self.refresh()
             else:
                 try:
                     import win32security
@@ -340,6 +492,7 @@ class FileInfo(object):
                              security.st_uid, security.st_gid)
                 if information & 0x4:
                     os.chflags(self.original_path, security.st_flags)
+                self.refresh()
             else:
                 try:
                     import win32security
@@ -367,6 +520,7 @@ class FileInfo(object):
                 os.rename(self.original_path, self.original_path)
                 shutil.move(self.original_path, location)
                 self.__path = location
+                self.refresh()
             else:
                 raise DirectoryAlreadyExistsException(
                     "'%s' already exists" % location)
@@ -520,6 +674,46 @@ class FileInfo(object):
         raise UnauthorizedAccessException(
             "'%s' is not a file" % self.original_path)
 
+    def mmap(self, access="r", offset=0, length=None):
+        '''
+        fi.mmap(access, offset, length) -> MappedFile object
+        Maps 'length' bytes of the file from 'offset' into memory (defaults to the whole file), for use in a with statement.
+        Indexing and slicing the result return memoryview slices of the map, so random reads copy nothing through file buffers.
+        'access' is "r" (read-only, the default), "w" (writes go to the file) or "c" (copy-on-write).
+        '''
+        if os.path.isfile(self.original_path):
+            return MappedFile(self.original_path, access, offset, length)
+        if os.path.exists(self.original_path):
+            raise UnauthorizedAccessException(
+                "'%s' is not a file" % self.original_path)
+        raise FileNotFoundException("'%s' not found" % self.original_path)
+
+    def iter_chunks(self, size=streaming.DEFAULT_CHUNK_SIZE, offset=0, length=None):
+        '''
+        fi.iter_chunks(size, offset, length) -> generator over memoryview
+        Returns a generator over the file contents in chunks of up to 'size' bytes, from 'offset' and up to 'length' bytes (defaults to the rest of the file).
+        The chunks are views of a single reused buffer, valid until the next chunk is read; copy them with bytes() to keep them.
+        '''
+        self.__check_file()
+        return streaming.iter_chunks(self.original_path, size, offset, length)
+
+    def iter_lines(self, encoding="UTF-8", errors="strict", buffer_size=streaming.DEFAULT_CHUNK_SIZE, keepends=False):
+        '''
+        fi.iter_lines(encoding, errors, buffer_size, keepends) -> generator over str
+        Returns a generator over the lines of a text file, decoded from blocks of 'buffer_size' bytes split whole rather than read line by line.
+        'encoding' defaults to "UTF-8" (None yields bytes lines) and 'errors' to "strict".
+        Line endings ("\n" or "\r\n") are stripped unless 'keepends' is True.
+        '''
+        self.__check_file()
+        return streaming.iter_lines(self.original_path, encoding, errors, buffer_size, keepends)
+
+    def __check_file(self):
+        if not os.path.isfile(self.original_path):
+            if os.path.exists(self.original_path):
+                raise UnauthorizedAccessException(
+                    "'%s' is not a file" % self.original_path)
+            raise FileNotFoundException("'%s' not found" % self.original_path)
+
     def open_text(self):
         '''
         fi.open_text -> file object
@@ -568,23 +762,44 @@ class FileInfo(object):
         raise UnauthorizedAccessException(
             "'%s' is not a file" % self.original_path)
 
-    def replace(self, file, backup):
+    def replace(self, file, backup=None):
         '''
         fi.replace(file, backup) -> None
         Replaces the contents of a specified file with the file described by the current FileInfo object, deleting the original file, and creating a backup of the replaced file.
+        The backup is hard linked before the file is atomically renamed over 'file', so 'file' never goes missing; 'backup' defaults to None, no backup.
         '''
         if os.path.exists(file):
-            if not self.__is_valid_path(backup):
-                raise InvalidPathException("'%s' is not valid path" % backup)
-            if not os.path.exists(backup):
-                shutil.move(file, backup)
-                self.move_to(file)
-            else:
-                raise FileAlreadyExistsException(
-                    "'%s' already exists" % backup)
+            if not os.path.isfile(self.original_path):
+                raise FileNotFoundException(
+                    "'%s' not found or is not a file" % self.original_path)
+            if backup is not None:
+                if not self.__is_valid_path(backup):
+                    raise InvalidPathException("'%s' is not valid path" % backup)
+                if os.path.exists(backup):
+                    raise FileAlreadyExistsException(
+                        "'%s' already exists" % backup)
+            atomic.replace_file(self.original_path, file, backup)
+            self.__path = file
+            self.refresh()
         else:
             raise FileNotFoundException("'%s' not found" % file)
 
+    def write_atomic(self, data, fsync=True, batch=None):
+        '''
+        fi.write_atomic(data, fsync, batch) -> None
+        Replaces the contents of the file with 'data' (bytes, str written as UTF-8, or an iterable of them), so that a crash leaves either the old or the new contents:
+        the data goes to a temporary file in the same directory, flushed with fsync, renamed over the file, and the directory is flushed. 'fsync' defaults to True.
+        If 'batch' is an AtomicBatch, the write is staged and made durable with the other writes of the batch when it is committed.
+        '''
+        if os.path.isdir(self.original_path):
+            raise UnauthorizedAccessException(
+                "'%s' is not a file" % self.original_path)
+        if batch is not None:
+            batch.write(self.original_path, data)
+        else:
+            atomic.write_atomic(self.original_path, data, fsync)
+        self.refresh()
+
     def create_subdirectory(self, dirname):
         '''
         fi.create_subdirectory -> FileInfo object
@@ -622,147 +837,195 @@ class FileInfo(object):
             raise NotSupportedException(
                 "'%s' is not a directory" % self.original_path)
 
-    def get_directories(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def get_directories(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
         '''
-        fi.get_directories(search, option) -> list of FileInfo of the subdirectories
+        fi.get_directories(search, option, workers, ordered, max_pending) -> list of FileInfo of the subdirectories
         Returns the subdirectories of the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
         '''
-        return list(self.iter_directories(search, option))
+        return list(self.iter_directories(search, option, workers, ordered, max_pending))
 
-    def get_files(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def get_files(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
         '''
-        fi.get_files(search, option) -> list of FileInfo of the filenames
+        fi.get_files(search, option, workers, ordered, max_pending) -> list of FileInfo of the filenames
         Returns a file list from the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
         '''
-        return list(self.iter_files(search, option))
+        return list(self.iter_files(search, option, workers, ordered, max_pending))
 
-    def get_items(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def get_items(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
         '''
-        fi.get_items(search, option) -> list of FileInfo of the filenames and subdirectories
+        fi.get_items(search, option, workers, ordered, max_pending) -> list of FileInfo of the filenames and subdirectories
         Returns a list of files and subdirectories from the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
+        '''
+        return list(self.iter_items(search, option, workers, ordered, max_pending))
+
+    def get_file_set(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None):
+        '''
+        fi.get_file_set(search, option, workers) -> FileInfoSet object
+        Returns the files from the current directory as a columnar FileInfoSet, holding their paths, sizes, modification times, modes, inode numbers and attributes.
+        See get_files() for 'search', 'option' and 'workers'.
         '''
-        return list(self.iter_items(search, option))
+        return self.__scan_set(search, option, workers, directories=False)
 
-    def iter_directories(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def get_item_set(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None):
         '''
-        fi.iter_directories(search, option) -> generator over subdirectories in path
+        fi.get_item_set(search, option, workers) -> FileInfoSet object
+        Returns the files and subdirectories from the current directory as a columnar FileInfoSet.
+        See get_items() for 'search', 'option' and 'workers'.
+        '''
+        return self.__scan_set(search, option, workers)
+
+    def __scan_set(self, search, option, workers, directories=True):
+        path, recursive = self.__search_root(option)
+        match = None if search == "*" else compile_search(search).match
+        return FileInfoSet.from_scan(path, recursive, match, directories=directories, workers=workers)
+
+    def iter_directories(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
+        '''
+        fi.iter_directories(search, option, workers, ordered, max_pending) -> generator over subdirectories in path
         Returns a generator over subdirectories from the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
         '''
-        if not os.path.isdir(self.original_path):
-            raise NotSupportedException(
-                "'%s' is not a directory" % self.original_path)
-        if option == DirectorySearchOption.TOP_DIRECTORY_ONLY:
-            for name in os.listdir(self.original_path):
-                if os.path.isdir(os.path.join(self.original_path, name)) and fnmatch.fnmatch(name, search):
-                    yield FileInfo(os.path.join(self.original_path, name))
-        elif option == DirectorySearchOption.ALL_DIRECTORIES:
-            pathlist = [self.full_path]
-            lx = 1
-            while lx:
-                for name in os.listdir(pathlist[0]):
-                    next = os.path.join(pathlist[0], name)
-                    if os.path.isdir(next):
-                        if fnmatch.fnmatch(name, search):
-                            yield FileInfo(next)
-                        pathlist += [next]
-                        lx += 1
-                del pathlist[0]
-                lx -= 1
-        else:
-            raise TypeError("invalid arguments")
+        return self.__walk(search, option, workers, ordered, max_pending, files=False)
 
-    def iter_files(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def iter_files(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
         '''
-        fi.iter_files(search, option) -> generator over files in path
+        fi.iter_files(search, option, workers, ordered, max_pending) -> generator over files in path
         Returns a generator over files from the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
         '''
-        if not os.path.isdir(self.original_path):
-            raise NotSupportedException(
-                "'%s' is not a directory" % self.original_path)
-        if option == DirectorySearchOption.TOP_DIRECTORY_ONLY:
-            for name in os.listdir(self.original_path):
-                if os.path.isfile(os.path.join(self.original_path, name)) and fnmatch.fnmatch(name, search):
-                    yield FileInfo(os.path.join(self.original_path, name))
-        elif option == DirectorySearchOption.ALL_DIRECTORIES:
-            pathlist = [self.full_path]
-            lx = 1
-            while lx:
-                for name in os.listdir(pathlist[0]):
-                    next = os.path.join(pathlist[0], name)
-                    if os.path.isfile(next) and fnmatch.fnmatch(name, search):
-                        yield FileInfo(next)
-                    elif os.path.isdir(next):
-                        pathlist += [next]
-                        lx += 1
-                del pathlist[0]
-                lx -= 1
-        else:
-            raise TypeError("invalid arguments")
+        return self.__walk(search, option, workers, ordered, max_pending, directories=False)
 
-    def iter_items(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY):
+    def iter_items(self, search="*", option=DirectorySearchOption.TOP_DIRECTORY_ONLY, workers=None, ordered=True, max_pending=None):
         '''
-        fi.iter_items(search, option) -> generator over items in path.
+        fi.iter_items(search, option, workers, ordered, max_pending) -> generator over items in path.
         Returns a generator over items from the current directory.
+        'search' should be a glob pattern or a SearchPattern. Defaults to '*'.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        'workers' sets the number of threads listing subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded);
+        'ordered' keeps the single-threaded output order (defaults to True) and 'max_pending' bounds the directory listings in flight.
+        '''
+        return self.__walk(search, option, workers, ordered, max_pending)
+
+    def __search_root(self, option):
+        '''
+        Returns the path to enumerate and whether to recurse for the DirectorySearchOption 'option'.
         '''
         if not os.path.isdir(self.original_path):
             raise NotSupportedException(
                 "'%s' is not a directory" % self.original_path)
         if option == DirectorySearchOption.TOP_DIRECTORY_ONLY:
-            for name in os.listdir(self.original_path):
-                if fnmatch.fnmatch(name, search):
-                    yield FileInfo(os.path.join(self.original_path, name))
+            return self.original_path, False
         elif option == DirectorySearchOption.ALL_DIRECTORIES:
-            pathlist = [self.full_path]
-            lx = 1
-            while lx:
-                for name in os.listdir(pathlist[0]):
-                    next = os.path.join(pathlist[0], name)
-                    if fnmatch.fnmatch(name, search):
-                        yield FileInfo(next)
-                    if os.path.isdir(next):
-                        pathlist += [next]
-                        lx += 1
-                del pathlist[0]
-                lx -= 1
-        else:
-            raise TypeError("invalid arguments")
+            return self.full_path, True
+        raise TypeError("invalid arguments")
+
+    def __walk(self, search, option, workers=None, ordered=True, max_pending=None, files=True, directories=True):
+        '''
+        Enumerates the directory with os.scandir, yielding FileInfo objects for the entries of the requested kinds whose name matches 'search'.
+        The yielded objects keep their directory entry, so their metadata properties reuse its cached stat,
+        and their full path is derived from the resolved path of their directory unless they are symbolic links.
+        '''
+        path, recursive = self.__search_root(option)
+        match = compile_search(search).match
+        # resolved paths of the directories still to be listed, keyed by the path prefix of their entries
+        parents = {os.path.join(path, ""): self.full_path}
+        current = parent = None
+        for entry in walker.iter_entries(path, recursive, workers, ordered, max_pending):
+            prefix = entry.path[:len(entry.path) - len(entry.name)]
+            if prefix != current:
+                # the entries of a directory are enumerated together, so its resolved path is not needed anymore
+                parents.pop(current, None)
+                current = prefix
+                parent = parents.get(prefix)
+            is_dir = entry.is_dir()
+            full_path = None
+            if recursive and is_dir:
+                full_path = resolve_entry(entry, parent)
+                parents[os.path.join(entry.path, "")] = full_path
+            if not files and not is_dir:
+                continue
+            if not directories and not entry.is_file():
+                continue
+            if match(entry.name):
+                if full_path is None:
+                    full_path = resolve_entry(entry, parent)
+                yield FileInfo._trusted(entry.path, entry, full_path)
+
+    def get_directory_length(self, option=DirectorySearchOption.TOP_DIRECTORY_ONLY, search="*", allocated=False, dedupe_links=True, workers=None):
+        '''
+        fi.get_directory_length(option, search, allocated, dedupe_links, workers) -> int
+        Returns the Length of files in a directory.
+        'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        If 'allocated' is True, returns the bytes allocated on disk instead of the apparent size. Defaults to False.
+        See get_directory_usage() for 'dedupe_links' and 'workers'.
+        '''
+        usage = self.get_directory_usage(option, search, dedupe_links, workers)
+        return usage.allocated if allocated else usage.length
 
-    def get_directory_length(self, option=DirectorySearchOption.TOP_DIRECTORY_ONLY, search="*"):
+    def get_directory_usage(self, option=DirectorySearchOption.TOP_DIRECTORY_ONLY, search="*", dedupe_links=True, workers=None):
         '''
-        fi.get_directory_length(option) -> int
-        Returns the Length of files in a directory.
+        fi.get_directory_usage(option, search, dedupe_links, workers) -> DirectoryUsage object
+        Returns the number of files, their apparent size and the bytes allocated on disk for them, reading one stat per entry.
         'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'TOP_DIRECTORY_ONLY'.
+        If 'dedupe_links' is True, hard links to the same file are counted once. Defaults to True.
+        'workers' sets the number of threads listing and reading subdirectories concurrently with 'ALL_DIRECTORIES' (defaults to None, single-threaded).
+        '''
+        path, recursive = self.__search_root(option)
+        match = None if search == "*" else compile_search(search).match
+        return walker.directory_usage(path, recursive, match, dedupe_links, workers)
+
+    def compare_with(self, other, shallow=True, workers=None):
         '''
-        length = 0
-        for fi in self.iter_files(search, option):
-            length += fi.length
-        return length
+        fi.compare_with(other, shallow, workers) -> True if equals, False otherwise.
+        Compare the path in FileInfo with a file in other path or FileInfo, or compare two directory trees recursively.
+        See compare() for 'shallow' and 'workers'.
+        '''
+        return bool(self.compare(other, shallow, workers))
 
-    def compare_with(self, other):
+    def compare(self, other, shallow=True, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
         '''
-        fi.compare_with(other) -> True if equals, False otherwise.
-        Compare the path in FileInfo with a file in other path or FileInfo, or compare the common files in two directories.
+        fi.compare(other, shallow, workers, chunk_size, use_mmap) -> ComparisonResult object
+        Compare the path in FileInfo with a file in other path or FileInfo, or compare two directory trees recursively,
+        returning the equal, different, left only and right only relative paths (true if both sides are equal).
+        Files are rejected on size before any byte is read; if 'shallow' is True, files with the same size and modification time are taken as equal. Defaults to True.
+        'workers' sets the number of threads comparing file contents (defaults to None, single-threaded);
+        contents are read in chunks of 'chunk_size' bytes, through memory maps if 'use_mmap' is True.
         '''
         if os.path.exists(self.original_path):
             if isinstance(other, FileInfo):
                 other = other.full_path
             if os.path.exists(other):
-                import filecmp
                 if os.path.isfile(self.original_path):
-                    return filecmp.cmp(self.original_path, other)
+                    result = ComparisonResult()
+                    if compare_files(self.original_path, other, shallow, chunk_size, use_mmap):
+                        result.equal.append(self.name)
+                    else:
+                        result.differ.append(self.name)
+                    return result
                 elif os.path.isdir(self.original_path):
                     if os.path.isdir(other):
-                        commfiles = filecmp.dircmp(
-                            self.original_path, other).common_files
-                        return bool(commfiles) and (filecmp.cmpfiles(self.original_path, other, commfiles)[0] == commfiles)
-                    else:
-                        return False
+                        return compare_trees(self.original_path, other, shallow, chunk_size, use_mmap, workers)
+                    result = ComparisonResult()
+                    result.differ.append(self.name)
+                    return result
                 else:
                     raise NotSupportedException(
                         "'%s' is not a file or directory" % self.original_path)
@@ -772,6 +1035,25 @@ class FileInfo(object):
             raise DirectoryNotFoundException(
                 "'%s' not found" % self.original_path)
 
+    def diff(self, other, use_hash=True, workers=4, algorithm="sha256", cache=None):
+        '''
+        fi.diff(other, use_hash, workers, algorithm, cache) -> TreeDiff object
+        Returns the entries added, removed, modified and renamed from the current directory tree to 'other',
+        a directory path, FileInfo or TreeSnapshot (such as a snapshot taken earlier of the same directory).
+        Both trees are walked concurrently and merged in sorted order. Entries are modified when their type, size or modification time differ,
+        confirmed by hashing the files of the same size if 'use_hash' is True; renames are detected by inode on the same device.
+        See diff_trees() for details.
+        '''
+        if not os.path.isdir(self.original_path):
+            raise DirectoryNotFoundException(
+                "'%s' not found or is not a directory" % self.original_path)
+        if isinstance(other, FileInfo):
+            other = other.full_path
+        if not isinstance(other, TreeSnapshot) and not os.path.isdir(other):
+            raise DirectoryNotFoundException(
+                "'%s' not found or is not a directory" % other)
+        return diff_trees(self.full_path, other, use_hash, workers, algorithm, cache)
+
     def compress(self):
         '''
         fi.compress() -> None
@@ -842,11 +1124,11 @@ class FileInfo(object):
         directory = os.path.join(directory, self.name)
         self.move_to(directory)
 
-    def copy_to_directory(self, directory, overwrite=False):
+    def copy_to_directory(self, directory, overwrite=False, progress=None):
         '''
-        fi.copy_to_directory(directory, overwrite) -> FileInfo object
+        fi.copy_to_directory(directory, overwrite, progress) -> FileInfo object
         Copies an existing file or directory to a new location without renaming it, allowing the overwriting of an existing file or directory.
-        'overwrite' defaults to False.
+        'overwrite' defaults to False. See copy_to() for 'progress'.
         '''
         if directory == self.directory_name:
             return FileInfo(self.original_path)
@@ -854,7 +1136,67 @@ class FileInfo(object):
             raise NotSupportedException(
                 "'directory' must be a path, not a file; use copy_to() instead")
         directory = os.path.join(directory, self.name)
-        return self.copy_to(directory, overwrite)
+        return self.copy_to(directory, overwrite, progress)
+
+    def find_duplicates(self, search="*", option=DirectorySearchOption.ALL_DIRECTORIES, min_size=1, algorithm="sha256", workers=4, cache=None):
+        '''
+        fi.find_duplicates(search, option, min_size, algorithm, workers, cache) -> list of lists of FileInfo
+        Returns the groups of files with identical contents in the current directory.
+        Files are grouped by size, then by a hash of their first and last few KB, and only the groups that still collide are fully hashed on 'workers' threads.
+        Hard links to the same file are not reported as duplicates. Files smaller than 'min_size' bytes are skipped.
+        'option' should be one of the enumeration DirectorySearchOption values. Dafaults to 'ALL_DIRECTORIES'.
+        If 'cache' is a HashCache, the full digests are read from and stored in it.
+        '''
+        path, recursive = self.__search_root(option)
+        match = None if search == "*" else compile_search(search).match
+        groups = duplicates.find_duplicates(
+            path, recursive, match, min_size, algorithm, workers=workers, cache=cache)
+        return [[FileInfo._trusted(p) for p in group] for group in groups]
+
+    def hash(self, algorithm="sha256", chunk_size=hashing.DEFAULT_CHUNK_SIZE, cache=None):
+        '''
+        fi.hash(algorithm, chunk_size, cache) -> str
+        Returns the hex digest of the file contents, streamed through a reused buffer of 'chunk_size' bytes without holding the GIL.
+        'algorithm' is any name accepted by hashlib.new(). Defaults to "sha256".
+        If 'cache' is a HashCache, the digest is read from it while the file is unchanged, and stored in it otherwise.
+        '''
+        if os.path.isfile(self.original_path):
+            return hashing.hash_file(self.original_path, algorithm, chunk_size, cache)
+        if os.path.exists(self.original_path):
+            raise UnauthorizedAccessException(
+                "'%s' is not a file" % self.original_path)
+        raise FileNotFoundException("'%s' not found" % self.original_path)
+
+    def snapshot(self, previous=None, workers=None, verify_files=False):
+        '''
+        fi.snapshot(previous, workers, verify_files) -> TreeSnapshot object
+        Captures the size, modification time, mode and inode of every entry of the directory tree, to be saved with TreeSnapshot.save().
+        If 'previous' is a TreeSnapshot of the same directory (or the path of a saved one), the tree is rescanned incrementally:
+        only the directories whose mtime changed are listed again. See TreeSnapshot.rescan() for 'verify_files'.
+        '''
+        if not os.path.isdir(self.original_path):
+            raise DirectoryNotFoundException(
+                "'%s' not found or is not a directory" % self.original_path)
+        if previous is None:
+            return TreeSnapshot.capture(self.full_path, workers)
+        if not isinstance(previous, TreeSnapshot):
+            previous = TreeSnapshot.load(previous)
+        if previous.root != self.full_path:
+            raise InvalidPathException(
+                "snapshot of '%s' can't be used for '%s'" % (previous.root, self.full_path))
+        return previous.rescan(workers, verify_files)
+
+    def watch(self, recursive=True, interval=1.0, coalesce=0.1, polling=False):
+        '''
+        fi.watch(recursive, interval, coalesce, polling) -> DirectoryWatcher object
+        Returns a watcher yielding WatchEvent objects for the entries created, modified, deleted or moved in the directory
+        (and its subdirectories if 'recursive' is True). Changes come from inotify on Linux, and from a stat snapshot compared
+        every 'interval' seconds elsewhere or if 'polling' is True. Bursts of events are merged once quiet for 'coalesce' seconds.
+        '''
+        if not os.path.isdir(self.original_path):
+            raise DirectoryNotFoundException(
+                "'%s' not found or is not a directory" % self.original_path)
+        return DirectoryWatcher(self.full_path, recursive, interval, coalesce, polling)
 
     def join(self, other):
         '''
@@ -875,7 +1217,10 @@ class FileInfo(object):
         type: str
         Represents the fully qualified path of the directory or file.
         '''
-        return os.path.realpath(self.__path)
+        full_path = self.__full_path
+        if full_path is None:
+            full_path = self.__full_path = os.path.realpath(self.__path)
+        return full_path
 
     @property
     def original_path(self):
@@ -922,6 +1267,7 @@ class FileInfo(object):
                     if os.path.isdir(self.original_path):
                         attrib &= ~0x100
                     win32file.SetFileAttributes(self.original_path, attrib)
+                    self.refresh()
             else:
                 raise DirectoryNotFoundException(
                     "'%s' not found" % self.original_path)
@@ -933,13 +1279,14 @@ class FileInfo(object):
             '''
 		type: datetime
 		Gets or sets the creation time of the current directory or file.
+		On Linux, the birth time is read with statx(2); where the file system does not record it, the time of the last status change is returned.
 		Set is win32 only.
 		'''
 
         def fget(self):
-            if os.path.exists(self.original_path):
-                return datetime.datetime.fromtimestamp(os.path.getctime(self.original_path))
-            raise FileNotFoundException("'%s' not found" % self.original_path)
+            st = self.__stat(StatFields.BTIME | StatFields.CTIME)
+            birthtime = getattr(st, "st_birthtime", None)
+            return datetime.datetime.fromtimestamp(birthtime if birthtime is not None else st.st_ctime)
 
         def fset(self, settime):
             try:
@@ -961,6 +1308,7 @@ class FileInfo(object):
                 settime.timetuple()) + (settime.microsecond / 1000000.0))
             win32file.SetFileTime(hFile, ctime, None, None)
             win32file.CloseHandle(hFile)
+            self.refresh()
         return locals()
 
     @property
@@ -980,7 +1328,7 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            return os.path.dirname(self.full_path)
+            return self.__name_parts()[0]
 
         def fset(self, new):
             self.MoveToDirectory(new)
@@ -1003,7 +1351,7 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            return os.path.splitext(self.full_path)[1]
+            return self.__name_parts()[3]
 
         def fset(self, new):
             if not isinstance(new, basestring) or not new or new[0] != ".":
@@ -1036,17 +1384,17 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            if os.path.exists(self.original_path):
-                mode = os.stat(self.original_path)[0]
-                return (mode & stat.S_IWRITE == 0) and (mode & stat.S_IREAD != 0)
-            raise FileNotFoundException("'%s' not found" % self.original_path)
+            mode = self.__stat(StatFields.MODE).st_mode
+            return (mode & stat.S_IWRITE == 0) and (mode & stat.S_IREAD != 0)
 
         def fset(self, boolean):
             if os.path.exists(self.original_path):
                 if boolean:
-                    return os.chmod(self.original_path, os.stat(self.original_path)[0] & ~stat.S_IWRITE | stat.S_IREAD)
+                    os.chmod(self.original_path, os.stat(self.original_path)[0] & ~stat.S_IWRITE | stat.S_IREAD)
                 else:
-                    return os.chmod(self.original_path, os.stat(self.original_path)[0] | stat.S_IWRITE | stat.S_IREAD)
+                    os.chmod(self.original_path, os.stat(self.original_path)[0] | stat.S_IWRITE | stat.S_IREAD)
+                self.refresh()
+                return
             raise FileNotFoundException("'%s' not found" % self.original_path)
         return locals()
 
@@ -1059,16 +1407,16 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            if os.path.exists(self.original_path):
-                return datetime.datetime.fromtimestamp(os.path.getatime(self.original_path))
-            raise FileNotFoundException("'%s' not found" % self.original_path)
+            return datetime.datetime.fromtimestamp(self.__stat(StatFields.ATIME).st_atime)
 
         def fset(self, settime):
             if os.path.exists(self.original_path):
                 import time
                 settime = time.mktime(settime.timetuple()) + \
                     (settime.microsecond / 1000000.0)
-                return os.utime(self.original_path, (settime, os.path.getmtime(self.original_path)))
+                os.utime(self.original_path, (settime, os.path.getmtime(self.original_path)))
+                self.refresh()
+                return
             raise FileNotFoundException("'%s' not found" % self.original_path)
         return locals()
 
@@ -1081,16 +1429,16 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            if os.path.exists(self.original_path):
-                return datetime.datetime.fromtimestamp(os.path.getmtime(self.original_path))
-            raise FileNotFoundException("'%s' not found" % self.original_path)
+            return datetime.datetime.fromtimestamp(self.__stat(StatFields.MTIME).st_mtime)
 
         def fset(self, settime):
             if os.path.exists(self.original_path):
                 import time
                 settime = time.mktime(settime.timetuple()) + \
                     (settime.microsecond / 1000000.0)
-                return os.utime(self.original_path, (os.path.getatime(self.original_path), settime))
+                os.utime(self.original_path, (os.path.getatime(self.original_path), settime))
+                self.refresh()
+                return
             raise FileNotFoundException("'%s' not found" % self.original_path)
         return locals()
 
@@ -1100,9 +1448,7 @@ class FileInfo(object):
         type: int
         Gets the size, in bytes, of the current file.
         '''
-        if os.path.exists(self.original_path):
-            return os.path.getsize(self.original_path)
-        raise FileNotFoundException("'%s' not found" % self.original_path)
+        return self.__stat(StatFields.SIZE).st_size
 
     @Property
     def name():
@@ -1113,7 +1459,7 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            return os.path.basename(self.full_path)
+            return self.__name_parts()[1]
 
         def fset(self, new):
             self.Rename(new)
@@ -1128,7 +1474,7 @@ class FileInfo(object):
 		'''
 
         def fget(self):
-            return os.path.basename(os.path.splitext(self.full_path)[0])
+            return self.__name_parts()[2]
 
         def fset(self, val):
             self.Rename(val + self.extension)
@@ -1183,4 +1529,7 @@ class FileInfo(object):
 __all__ = ["FileInfo", "FileInfoError", "FileNotFoundException", "FileAlreadyExistsException",
            "DirectoryNotFoundException", "DirectoryAlreadyExistsException", "InvalidPathException",
            "NotSupportedException", "UnauthorizedAccessException", "FileAttributes", "DirectorySearchOption",
-           "SecurityInformation"]
+           "SecurityInformation", "SearchPattern", "DirectoryUsage",
+           "ComparisonResult", "HashCache", "SyncSummary",
+           "DeleteHandle", "FileInfoSet", "TreeSnapshot", "SnapshotEntry",
+           "DirectoryWatcher", "WatchEvent", "TreeDiff", "MappedFile", "AtomicBatch", "StatFields", "StatxResult"]
@@ -0,0 +1,261 @@
+'''
+   Columnar directory listings for FileInfo class
+'''
+
+import os
+import stat
+import datetime
+from array import array
+from .walker import iter_entries
+from .helpers import FileAttributes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_S_IFMT = 0o170000
+_TYPECODES = (("size", "q"), ("mtime_ns", "q"), ("mode", "I"), ("inode", "Q"), ("attributes", "I"))
+
+
+def _attributes(entry, st):
+    # Windows reports the real attributes; elsewhere the portable subset is derived from the name and the mode
+    attributes = getattr(st, "st_file_attributes", None)
+    if attributes is not None:
+        return attributes
+    attributes = 0
+    if stat.S_ISDIR(st.st_mode):
+        attributes |= FileAttributes.DIRECTORY
+    if not st.st_mode & 0o222:
+        attributes |= FileAttributes.READ_ONLY
+    if entry.name.startswith("."):
+        attributes |= FileAttributes.HIDDEN
+    if entry.is_symlink():
+        attributes |= FileAttributes.REPARSE_POINT
+    return attributes or FileAttributes.NORMAL
+
+
+def _ns(value):
+    if isinstance(value, datetime.datetime):
+        value = value.timestamp()
+    return int(value * 1000000000)
+
+
+class FileInfoSet(object):
+    '''
+    FileInfoSet() -> FileInfoSet object
+    A directory listing stored in compact columns: directory index and name of every entry, plus its 'size', 'mtime_ns', 'mode', 'inode'
+    and 'attributes' (FileAttributes bits: the real ones on Windows, DIRECTORY, READ_ONLY, HIDDEN, REPARSE_POINT or NORMAL elsewhere) in array module arrays (exposed as NumPy arrays when NumPy is installed).
+    Filtering, sorting and aggregation work on whole columns; FileInfo objects are only created for the rows actually accessed.
+    '''
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.__directories = []
+        self.__dir_index = array("I")
+        self.__names = []
+        self.__columns = {name: array(code) for name, code in _TYPECODES}
+
+    @classmethod
+    def from_scan(cls, path, recursive=False, match=None, files=True, directories=True, workers=None):
+        '''
+        FileInfoSet.from_scan(path, recursive, match, files, directories, workers) -> FileInfoSet object
+        Scans the directory 'path' (recursively if 'recursive' is True), keeping the entries of the requested kinds whose names pass 'match'.
+        Entries that vanish while being scanned are skipped.
+        '''
+        result = cls()
+        directory_ids = {}
+        columns = [result.__columns[name] for name, code in _TYPECODES]
+        for entry in iter_entries(path, recursive, workers, prefetch_stat=True):
+            is_dir = entry.is_dir()
+            if (is_dir and not directories) or (not is_dir and not (files and entry.is_file())):
+                continue
+            if match is not None and not match(entry.name):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            parent = os.path.dirname(entry.path)
+            index = directory_ids.get(parent)
+            if index is None:
+                index = directory_ids[parent] = len(result.__directories)
+                result.__directories.append(parent)
+            result.__dir_index.append(index)
+            result.__names.append(entry.name)
+            for column, value in zip(columns, (st.st_size, st.st_mtime_ns, st.st_mode, st.st_ino, _attributes(entry, st))):
+                column.append(value)
+        return result
+
+    #----------------------- Methods ------------------------------
+    def __len__(self):
+        '''
+        Return len(self).
+        '''
+        return len(self.__names)
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<FileInfoSet entries=%i size=%i>' % (len(self), self.sum("size"))
+
+    def __iter__(self):
+        '''
+        Implement iter(self), yielding a FileInfo object per row.
+        '''
+        from .fileinfo import FileInfo
+        for i in range(len(self)):
+            yield FileInfo._trusted(self.path(i))
+
+    def __getitem__(self, index):
+        '''
+        Returns x[index]: a FileInfo object for an integer index, or a FileInfoSet for a slice.
+        '''
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        from .fileinfo import FileInfo
+        return FileInfo._trusted(self.path(index))
+
+    def path(self, index):
+        '''
+        fs.path(index) -> str
+        Returns the path of the row 'index'.
+        '''
+        return os.path.join(self.__directories[self.__dir_index[index]], self.__names[index])
+
+    def paths(self):
+        '''
+        fs.paths() -> list of str
+        Returns the paths of all rows.
+        '''
+        directories = self.__directories
+        return [os.path.join(directories[d], name) for d, name in zip(self.__dir_index, self.__names)]
+
+    def names(self):
+        '''
+        fs.names() -> list of str
+        Returns the names of all rows.
+        '''
+        return list(self.__names)
+
+    def column(self, name):
+        '''
+        fs.column(name) -> numpy.ndarray or array.array
+        Returns the column 'name' ("size", "mtime_ns", "mode", "inode" or "attributes"); a read-only NumPy view when NumPy is installed.
+        '''
+        values = self.__columns[name]
+        if numpy is not None:
+            view = numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.array([], dtype=values.typecode)
+            view.flags.writeable = False
+            return view
+        return values
+
+    def take(self, indices):
+        '''
+        fs.take(indices) -> FileInfoSet object
+        Returns a new set with the rows at 'indices', in that order.
+        '''
+        if numpy is not None and isinstance(indices, numpy.ndarray):
+            indices = indices.tolist()
+        result = FileInfoSet()
+        result.__directories = self.__directories
+        result.__dir_index = array("I", (self.__dir_index[i] for i in indices))
+        result.__names = [self.__names[i] for i in indices]
+        for name, code in _TYPECODES:
+            values = self.__columns[name]
+            result.__columns[name] = array(code, (values[i] for i in indices))
+        return result
+
+    def filter(self, mask):
+        '''
+        fs.filter(mask) -> FileInfoSet object
+        Returns a new set with the rows whose value in 'mask' (a sequence of booleans, or a NumPy boolean array) is true.
+        '''
+        if numpy is not None:
+            return self.take(numpy.flatnonzero(numpy.asarray(mask, dtype=bool)))
+        return self.take([i for i, keep in enumerate(mask) if keep])
+
+    def where(self, min_size=None, max_size=None, modified_after=None, modified_before=None, kind=None, search=None,
+              attributes=None, exclude_attributes=None):
+        '''
+        fs.where(min_size, max_size, modified_after, modified_before, kind, search, attributes, exclude_attributes) -> FileInfoSet object
+        Returns a new set with the rows matching every given condition: size bounds in bytes (inclusive),
+        modification time bounds (datetime or seconds since the epoch, exclusive), 'kind' ("file" or "directory"), a 'search' glob or SearchPattern,
+        'attributes' that must all be set and 'exclude_attributes' that must all be clear (FileAttributes values, see FileAttributes.mask()).
+        '''
+        conditions = []
+        if min_size is not None:
+            conditions.append(("size", lambda v: v >= min_size))
+        if max_size is not None:
+            conditions.append(("size", lambda v: v <= max_size))
+        if modified_after is not None:
+            after = _ns(modified_after)
+            conditions.append(("mtime_ns", lambda v: v > after))
+        if modified_before is not None:
+            before = _ns(modified_before)
+            conditions.append(("mtime_ns", lambda v: v < before))
+        if kind is not None:
+            if kind not in ("file", "directory"):
+                raise TypeError("'kind' should be \"file\" or \"directory\"")
+            directory = kind == "directory"
+            conditions.append(("mode", lambda v: ((v & _S_IFMT) == stat.S_IFDIR) == directory))
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            for name, condition in conditions:
+                mask &= condition(self.column(name))
+        else:
+            mask = [True] * len(self)
+            for name, condition in conditions:
+                mask = [keep and condition(v) for keep, v in zip(mask, self.__columns[name])]
+        if attributes is not None or exclude_attributes is not None:
+            keep = FileAttributes.mask(self.column("attributes"), 0 if attributes is None else attributes,
+                                       0 if exclude_attributes is None else exclude_attributes)
+            mask = mask & keep if numpy is not None else [a and b for a, b in zip(mask, keep)]
+        if search is not None:
+            from .matcher import compile_search
+            match = compile_search(search).match
+            mask = [keep and match(name) for keep, name in zip(mask, self.__names)]
+        return self.filter(mask)
+
+    def sort_by(self, column="size", reverse=False):
+        '''
+        fs.sort_by(column, reverse) -> FileInfoSet object
+        Returns a new set sorted by 'column' ("size", "mtime_ns", "mode", "inode", "attributes", "name" or "path").
+        '''
+        if column == "name":
+            keys = self.__names
+        elif column == "path":
+            keys = self.paths()
+        elif numpy is not None:
+            order = numpy.argsort(self.column(column), kind="stable")
+            return self.take(order[::-1] if reverse else order)
+        else:
+            keys = self.__columns[column]
+        return self.take(sorted(range(len(self)), key=keys.__getitem__, reverse=reverse))
+
+    def sum(self, column="size"):
+        '''
+        fs.sum(column) -> int
+        Returns the sum of 'column'. Defaults to "size".
+        '''
+        if numpy is not None:
+            return int(self.column(column).sum()) if len(self) else 0
+        return sum(self.__columns[column])
+
+    def min(self, column="size"):
+        '''
+        fs.min(column) -> int or None
+        Returns the smallest value of 'column' (None if the set is empty). Defaults to "size".
+        '''
+        return min(self.__columns[column]) if len(self) else None
+
+    def max(self, column="size"):
+        '''
+        fs.max(column) -> int or None
+        Returns the largest value of 'column' (None if the set is empty). Defaults to "size".
+        '''
+        return max(self.__columns[column]) if len(self) else None
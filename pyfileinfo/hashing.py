@@ -0,0 +1,140 @@
+'''
+   Content hashing for FileInfo class
+'''
+
+import os
+import hashlib
+import threading
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def _signed(value):
+    # sqlite integers are signed 64 bits; st_dev and st_ino may not fit otherwise
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class HashCache(object):
+    '''
+    HashCache(path, commit_every=1000) -> HashCache object
+    Persistent cache of file digests, stored in a sqlite database at 'path' (":memory:" for a cache in memory).
+    Entries are keyed by (st_dev, st_ino, st_size, st_mtime_ns) and algorithm, so a file is read again only when it changes.
+    Writes are committed every 'commit_every' new digests and when the cache is closed; the cache is safe to share between threads.
+    '''
+
+    def __init__(self, path, commit_every=1000):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        import sqlite3
+        self.__lock = threading.Lock()
+        self.__commit_every = commit_every
+        self.__uncommitted = 0
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS digests (dev INTEGER, ino INTEGER, algorithm TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT,"
+            " PRIMARY KEY (dev, ino, algorithm))")
+        self.__db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, st, algorithm):
+        '''
+        hc.get(st, algorithm) -> str or None
+        Returns the cached hex digest for the file described by the os.stat_result 'st', or None if unknown or stale.
+        '''
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT digest FROM digests WHERE dev=? AND ino=? AND algorithm=? AND size=? AND mtime_ns=?",
+                (_signed(st.st_dev), _signed(st.st_ino), algorithm, st.st_size, st.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def set(self, st, algorithm, digest):
+        '''
+        hc.set(st, algorithm, digest) -> None
+        Stores the hex digest for the file described by the os.stat_result 'st'.
+        '''
+        with self.__lock:
+            self.__db.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                (_signed(st.st_dev), _signed(st.st_ino), algorithm, st.st_size, st.st_mtime_ns, digest))
+            self.__uncommitted += 1
+            if self.__uncommitted >= self.__commit_every:
+                self.__db.commit()
+                self.__uncommitted = 0
+
+    def flush(self):
+        '''
+        hc.flush() -> None
+        Commits the pending digests to disk.
+        '''
+        with self.__lock:
+            self.__db.commit()
+            self.__uncommitted = 0
+
+    def close(self):
+        '''
+        hc.close() -> None
+        Commits the pending digests and closes the database.
+        '''
+        self.flush()
+        self.__db.close()
+
+
+def _same_version(st1, st2):
+    return (st1.st_dev, st1.st_ino, st1.st_size, st1.st_mtime_ns) == (st2.st_dev, st2.st_ino, st2.st_size, st2.st_mtime_ns)
+
+
+def hash_stream(f, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE, limit=None):
+    '''
+    hash_stream(f, algorithm, chunk_size, limit) -> hashlib object
+    Hashes a binary file object from its current position, reading up to 'limit' bytes (defaults to None, the whole file) into a single reused buffer.
+    Both the reads and the hash updates release the GIL, so many files can be hashed concurrently on threads.
+    '''
+    digest = hashlib.new(algorithm)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while limit is None or limit > 0:
+        n = f.readinto(buf if limit is None or limit >= chunk_size else view[:limit])
+        if not n:
+            break
+        digest.update(view[:n])
+        if limit is not None:
+            limit -= n
+    return digest
+
+
+def hash_file(path, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    '''
+    hash_file(path, algorithm, chunk_size, cache) -> str
+    Returns the hex digest of the contents of the file 'path', streamed in chunks of 'chunk_size' bytes.
+    If 'cache' is a HashCache, unchanged files are answered from it and new digests are stored in it.
+    '''
+    with open(path, 'rb', buffering=0) as f:
+        if cache is None:
+            return hash_stream(f, algorithm, chunk_size).hexdigest()
+        before = os.fstat(f.fileno())
+        digest = cache.get(before, algorithm)
+        if digest is None:
+            digest = hash_stream(f, algorithm, chunk_size).hexdigest()
+            # a file modified while being read is not cached under its old version
+            if _same_version(before, os.fstat(f.fileno())):
+                cache.set(before, algorithm, digest)
+        return digest
+
+
+def hash_files(paths, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE, cache=None, workers=4):
+    '''
+    hash_files(paths, algorithm, chunk_size, cache, workers) -> generator over (path, hex digest)
+    Hashes many files on a pool of 'workers' threads, yielding the results in the order of 'paths'.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    paths = list(paths)
+    with ThreadPoolExecutor(workers) as executor:
+        digests = executor.map(lambda path: hash_file(path, algorithm, chunk_size, cache), paths)
+        for path, digest in zip(paths, digests):
+            yield path, digest
@@ -11,21 +11,38 @@ def Property(func):
 
 
 def translate(pat):
-    res = ''
+    res = []
     for c in pat:
         if c == '*':
-            res += '.*'
+            res.append('.*')
         elif c == '?':
-            res += '.'
+            res.append('.')
         else:
-            res += re.escape(c)
-    return res + "$"
+            res.append(re.escape(c))
+    res.append("$")
+    return ''.join(res)
 
 
 class Flag(object):
     '''
     Helper for flags.
+    The name and bit of every member are collected once per class into tables, which back repr() and the bulk decode() and mask().
     '''
+    _members = ()
+    _bits = {}
+    _cache = {}
+    _CACHE_SIZE = 4096
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        members = dict(cls._members)
+        for k, v in cls.__dict__.items():
+            if not k.startswith('_') and isinstance(v, int) and not isinstance(v, bool):
+                members[k] = v
+        cls._members = tuple(members.items())
+        cls._bits = members
+        cls._cache = {}
+
     @property
     def value(self):
         '''
@@ -49,7 +66,7 @@ class Flag(object):
             raise NotSupportedException()
 
     def __and__(self, other):
-        if isinstance(other, FileAttributes):
+        if isinstance(other, self.__class__):
             return self.__class__(self.value & other.value)
         elif isinstance(other, int):
             return self.__class__(self.value & other)
@@ -57,7 +74,7 @@ class Flag(object):
             raise NotSupportedException()
 
     def __xor__(self, other):
-        if isinstance(other, FileAttributes):
+        if isinstance(other, self.__class__):
             return self.__class__(self.value ^ other.value)
         elif isinstance(other, int):
             return self.__class__(self.value ^ other)
@@ -71,26 +88,94 @@ class Flag(object):
         return self & ~ other
 
     def __eq__(self, other):
-        if isinstance(other, FileAttributes):
+        if isinstance(other, self.__class__):
             return self.value == other.value
         elif isinstance(other, int):
             return self.value == other
         else:
             return False
 
+    def __hash__(self):
+        return hash(self.__value)
+
     def __repr__(self):
-        keys = []
-        for k, v in self._attributes.items():
-            if self.__value & v:
-                keys.append('{0}.{1}'.format(self.__class__.__name__, k))
+        keys = ['{0}.{1}'.format(self.__class__.__name__, k) for k in self.names(self.__value)]
         if not keys:
             raise NotSupportedException()
         return " | ".join(keys)
 
-    @property
-    def _attributes(self):
-        return {k: v for k, v in self.__class__.__dict__.items()
-                if not re.match('<function.*?>', str(v)) and not k.startswith('_')}
+    @classmethod
+    def names(cls, value):
+        '''
+        Flag.names(value) -> tuple of str
+        Returns the names of the members set in 'value' (an int or a flag of this class), in definition order.
+        '''
+        if isinstance(value, Flag):
+            value = value.value
+        names = cls._cache.get(value)
+        if names is None:
+            names = tuple(k for k, v in cls._members if value & v)
+            if len(cls._cache) >= cls._CACHE_SIZE:
+                cls._cache.clear()
+            cls._cache[value] = names
+        return names
+
+    @classmethod
+    def decode(cls, values):
+        '''
+        Flag.decode(values) -> list of tuple of str
+        Returns the member names set in each of 'values' (a sequence of ints, array.array or NumPy array), see names().
+        Each distinct value is decoded once, so a whole scan costs as much as its few distinct attribute combinations.
+        '''
+        numpy = _numpy()
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            distinct, inverse = numpy.unique(values, return_inverse=True)
+            decoded = [cls.names(int(v)) for v in distinct]
+            return [decoded[i] for i in inverse.tolist()]
+        names = cls.names
+        return [names(v) for v in values]
+
+    @classmethod
+    def mask(cls, values, include=0, exclude=0, match_any=False):
+        '''
+        Flag.mask(values, include, exclude, match_any) -> numpy.ndarray or list of bool
+        Returns, for each of 'values', whether it has every bit of 'include' set (any of them if 'match_any' is True) and none of 'exclude'.
+        'include' and 'exclude' are flags of this class or ints; 'values' a sequence of ints, array.array or NumPy array.
+        The test runs on the whole array at once with NumPy, and returns a NumPy boolean array when it is installed, a list otherwise:
+        either way, treat the result as a sequence of booleans (FileInfoSet.filter() takes both).
+        '''
+        include = cls.__bits_of(include)
+        exclude = cls.__bits_of(exclude)
+        numpy = _numpy()
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=numpy.int64)
+            if match_any:
+                keep = (values & include) != 0 if include else numpy.ones(len(values), dtype=bool)
+            else:
+                keep = (values & include) == include
+            if exclude:
+                keep &= (values & exclude) == 0
+            return keep
+        if match_any and include:
+            return [bool(v & include) and not v & exclude for v in values]
+        return [v & include == include and not v & exclude for v in values]
+
+    @classmethod
+    def __bits_of(cls, flags):
+        if isinstance(flags, cls):
+            return flags.value
+        elif isinstance(flags, int):
+            return flags
+        else:
+            raise TypeError("flags should be a bitwise combination of the enumeration %s values" % cls.__name__)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 
 class FileAttributes(Flag):
@@ -132,6 +217,24 @@ class SecurityInformation(Flag):
     PROTECTED_DACL = 0x80000000
 
 
+class StatFields(Flag):
+    '''
+    Define values for the metadata fields requested from statx
+    '''
+    TYPE = 0x1
+    MODE = 0x2
+    NLINK = 0x4
+    UID = 0x8
+    GID = 0x10
+    ATIME = 0x20
+    MTIME = 0x40
+    CTIME = 0x80
+    INO = 0x100
+    SIZE = 0x200
+    BLOCKS = 0x400
+    BTIME = 0x800
+
+
 class DirectorySearchOption(object):
     '''
     Define values for the DirectorySearch
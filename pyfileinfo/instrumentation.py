@@ -0,0 +1,374 @@
+'''
+   File system call instrumentation for FileInfo class
+'''
+
+import os
+import sys
+import time
+import types
+import bisect
+import shutil
+import builtins
+import threading
+from . import statx
+from .fileinfo import FileInfo
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+           0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# calls made outside any public FileInfo method, or on threads started by one
+UNATTRIBUTED = "none"
+
+# os and os.path functions that never touch the file system
+_PURE = {"fspath", "fsencode", "fsdecode", "strerror", "getpid", "cpu_count", "umask", "get_terminal_size",
+         "join", "basename", "dirname", "split", "splitext", "splitdrive", "normpath", "normcase", "isabs",
+         "commonprefix", "commonpath", "relpath", "getcwd", "getenv", "urandom", "WIFEXITED", "WEXITSTATUS", "makedev"}
+
+_FUNCTIONS = (types.BuiltinFunctionType, types.FunctionType)
+
+
+class LatencyHistogram(object):
+    '''
+    LatencyHistogram() -> LatencyHistogram object
+    Distribution of durations in seconds over the fixed BUCKETS, with their 'count' and 'sum'.
+    '''
+
+    def __init__(self):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<LatencyHistogram count=%i sum=%.6f>' % (self.count, self.sum)
+
+    def observe(self, seconds):
+        '''
+        lh.observe(seconds) -> None
+        Adds a duration to the histogram.
+        '''
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        '''
+        lh.quantile(q) -> float
+        Returns the upper bound of the bucket holding the 'q' quantile (0 to 1) of the durations; inf if it is beyond the last bucket.
+        '''
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+
+class _ModuleProxy(object):
+    '''
+    Stands for a module ('os', 'os.path' or 'shutil') in the namespace of an instrumented module, timing the calls to its functions.
+    '''
+
+    def __init__(self, module, prefix, record):
+        self.__module = module
+        self.__prefix = prefix
+        self.__record = record
+        if module is os:
+            self.path = _ModuleProxy(os.path, "path.", record)
+
+    def __getattr__(self, name):
+        value = getattr(self.__module, name)
+        if isinstance(value, _FUNCTIONS) and name not in _PURE and not name.startswith("_"):
+            value = _timed(value, self.__prefix + name, self.__record)
+        # cached on the proxy, so the next lookups of the name do not get here
+        setattr(self, name, value)
+        return value
+
+
+def _timed(func, name, record):
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    timed.__name__ = getattr(func, "__name__", name)
+    timed.__doc__ = func.__doc__
+    timed.__wrapped__ = func
+    return timed
+
+
+class Instrumentation(object):
+    '''
+    Instrumentation() -> Instrumentation object
+    Opt-in accounting of the file system calls made by the package. While enabled (with enable() or as a context manager),
+    every call to an os, os.path or shutil function, to statx(2) and to open() from the pyfileinfo modules is counted and timed,
+    and attributed to the outermost public FileInfo method or property running on the same thread (UNATTRIBUTED otherwise).
+    The latency of each call type and of each FileInfo method is kept in a LatencyHistogram.
+    Results are read with calls(), call_counts(), call_latency(), operations(), as_dict() or to_prometheus().
+    Only one instance can be enabled at a time; when disabled, the package runs its original, uninstrumented code.
+    '''
+
+    __active = None
+    __active_lock = threading.Lock()
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__patched_modules = []
+        self.__patched_members = []
+        self.reset()
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    #----------------------- Methods ------------------------------
+    @property
+    def enabled(self):
+        '''
+        type: bool
+        Gets a value indicating whether the instrumentation is active.
+        '''
+        return Instrumentation.__active is self
+
+    def reset(self):
+        '''
+        in.reset() -> None
+        Clears the recorded calls and operations.
+        '''
+        with self.__lock:
+            self.__calls = {}
+            self.__call_latency = {}
+            self.__operations = {}
+
+    def enable(self):
+        '''
+        in.enable() -> None
+        Starts recording: replaces the os, shutil and open globals of the pyfileinfo modules with timing proxies
+        and wraps the public FileInfo members to attribute the calls.
+        '''
+        with Instrumentation.__active_lock:
+            if Instrumentation.__active is self:
+                return
+            if Instrumentation.__active is not None:
+                raise RuntimeError("another Instrumentation is already enabled")
+            Instrumentation.__active = self
+        record = self.__record_call
+        proxies = {os: _ModuleProxy(os, "", record), shutil: _ModuleProxy(shutil, "shutil.", record)}
+        timed_open = _timed(builtins.open, "open", record)
+        for name, module in list(sys.modules.items()):
+            if module is None or not name.startswith(__package__ + ".") or name == __name__ or ".benchmark" in name:
+                continue
+            namespace = vars(module)
+            for key, value in list(namespace.items()):
+                if value is os or value is shutil:
+                    self.__patched_modules.append((namespace, key, value))
+                    namespace[key] = proxies[value]
+            if "open" not in namespace:
+                self.__patched_modules.append((namespace, "open", None))
+                namespace["open"] = timed_open
+        if statx.available():
+            # statx(2) is called through ctypes, not os
+            self.__patched_modules.append((vars(statx), "_statx", statx._statx))
+            statx._statx = _timed(statx._statx, "statx", record)
+        for name, member in list(vars(FileInfo).items()):
+            if name.startswith("_"):
+                continue
+            if isinstance(member, property):
+                wrapped = property(
+                    self.__attributed(member.fget, name) if member.fget else None,
+                    self.__attributed(member.fset, name) if member.fset else None,
+                    member.fdel, member.__doc__)
+            elif isinstance(member, types.FunctionType):
+                wrapped = self.__attributed(member, name)
+            else:
+                continue
+            self.__patched_members.append((name, member))
+            setattr(FileInfo, name, wrapped)
+
+    def disable(self):
+        '''
+        in.disable() -> None
+        Stops recording and restores the original modules and FileInfo members. The recorded data is kept.
+        '''
+        with Instrumentation.__active_lock:
+            if Instrumentation.__active is not self:
+                return
+            for name, member in reversed(self.__patched_members):
+                setattr(FileInfo, name, member)
+            for namespace, key, value in reversed(self.__patched_modules):
+                if value is None:
+                    del namespace[key]
+                else:
+                    namespace[key] = value
+            del self.__patched_members[:]
+            del self.__patched_modules[:]
+            Instrumentation.__active = None
+
+    def __attributed(self, func, name):
+        label = "FileInfo." + name
+        local = self.__local
+
+        def attributed(*args, **kwargs):
+            if getattr(local, "method", None) is not None:
+                return func(*args, **kwargs)
+            local.method = label
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                local.method = None
+                self.__record_operation(label, time.perf_counter() - start)
+            if isinstance(result, types.GeneratorType):
+                return self.__attributed_generator(result, label)
+            return result
+        attributed.__name__ = func.__name__
+        attributed.__doc__ = func.__doc__
+        attributed.__wrapped__ = func
+        return attributed
+
+    def __attributed_generator(self, generator, label):
+        '''
+        Runs each step of a generator returned by a FileInfo method under the attribution of that method.
+        '''
+        local = self.__local
+        try:
+            while True:
+                outer = getattr(local, "method", None)
+                if outer is None:
+                    local.method = label
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    if outer is None:
+                        local.method = None
+                        self.__record_operation(label, time.perf_counter() - start)
+                yield item
+        finally:
+            generator.close()
+
+    def __record_call(self, call, seconds):
+        method = getattr(self.__local, "method", None) or UNATTRIBUTED
+        key = (method, call)
+        with self.__lock:
+            entry = self.__calls.get(key)
+            if entry is None:
+                entry = self.__calls[key] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            histogram = self.__call_latency.get(call)
+            if histogram is None:
+                histogram = self.__call_latency[call] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def __record_operation(self, method, seconds):
+        with self.__lock:
+            histogram = self.__operations.get(method)
+            if histogram is None:
+                histogram = self.__operations[method] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def calls(self):
+        '''
+        in.calls() -> dict
+        Returns {(method, call): (count, seconds)} for every call type made by every FileInfo method.
+        '''
+        with self.__lock:
+            return {key: tuple(value) for key, value in self.__calls.items()}
+
+    def call_counts(self, method=None):
+        '''
+        in.call_counts(method) -> dict
+        Returns {call: count}, for the calls made by 'method' (such as "FileInfo.length") or, by default, by all methods.
+        '''
+        counts = {}
+        for (caller, call), (count, seconds) in self.calls().items():
+            if method is None or caller == method:
+                counts[call] = counts.get(call, 0) + count
+        return counts
+
+    def call_latency(self):
+        '''
+        in.call_latency() -> dict
+        Returns {call: LatencyHistogram} of the durations of each call type.
+        '''
+        with self.__lock:
+            return dict(self.__call_latency)
+
+    def operations(self):
+        '''
+        in.operations() -> dict
+        Returns {method: LatencyHistogram} of the durations of the public FileInfo methods; the steps of the generators they return
+        are added as separate observations.
+        '''
+        with self.__lock:
+            return dict(self.__operations)
+
+    def as_dict(self):
+        '''
+        in.as_dict() -> dict
+        Returns the recorded data as a JSON-serializable dict.
+        '''
+        def histogram(h):
+            return {"count": h.count, "sum": h.sum, "buckets": list(h.buckets)}
+        return {
+            "buckets": list(BUCKETS),
+            "calls": [{"method": method, "call": call, "count": count, "seconds": seconds}
+                      for (method, call), (count, seconds) in sorted(self.calls().items())],
+            "call_latency": {call: histogram(h) for call, h in sorted(self.call_latency().items())},
+            "operations": {method: histogram(h) for method, h in sorted(self.operations().items())},
+        }
+
+    def to_prometheus(self, prefix="pyfileinfo"):
+        '''
+        in.to_prometheus(prefix) -> str
+        Returns the recorded data in the Prometheus text exposition format: call counters and durations by method and call,
+        and latency histograms by call and by method.
+        '''
+        lines = []
+
+        def escape(value):
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def histograms(name, label, data, help_text):
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s histogram" % (prefix, name))
+            for key, h in sorted(data.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), h.buckets):
+                    cumulative += count
+                    lines.append('%s_%s_bucket{%s="%s",le="%s"} %i' % (
+                        prefix, name, label, escape(key), "+Inf" if bound == float("inf") else repr(bound), cumulative))
+                lines.append('%s_%s_sum{%s="%s"} %r' % (prefix, name, label, escape(key), h.sum))
+                lines.append('%s_%s_count{%s="%s"} %i' % (prefix, name, label, escape(key), h.count))
+
+        calls = sorted(self.calls().items())
+        lines.append("# HELP %s_fs_calls_total File system calls, by FileInfo method and call." % prefix)
+        lines.append("# TYPE %s_fs_calls_total counter" % prefix)
+        for (method, call), (count, seconds) in calls:
+            lines.append('%s_fs_calls_total{method="%s",call="%s"} %i' % (prefix, escape(method), escape(call), count))
+        lines.append("# HELP %s_fs_call_seconds_total Time spent in file system calls, by FileInfo method and call." % prefix)
+        lines.append("# TYPE %s_fs_call_seconds_total counter" % prefix)
+        for (method, call), (count, seconds) in calls:
+            lines.append('%s_fs_call_seconds_total{method="%s",call="%s"} %r' % (prefix, escape(method), escape(call), seconds))
+        histograms("fs_call_duration_seconds", "call", self.call_latency(), "Latency of the file system calls.")
+        histograms("operation_duration_seconds", "method", self.operations(), "Latency of the public FileInfo methods.")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,163 @@
+'''
+   Memory-mapped file access for FileInfo class
+'''
+
+import os
+import mmap
+
+_ACCESS = {"r": (mmap.ACCESS_READ, "rb"), "w": (mmap.ACCESS_WRITE, "r+b"), "c": (mmap.ACCESS_COPY, "rb")}
+
+_ADVICE = {"normal": "MADV_NORMAL", "random": "MADV_RANDOM", "sequential": "MADV_SEQUENTIAL",
+           "willneed": "MADV_WILLNEED", "dontneed": "MADV_DONTNEED"}
+
+
+class MappedFile(object):
+    '''
+    MappedFile(path, access="r", offset=0, length=None) -> MappedFile object
+    A memory map of 'length' bytes of the file 'path' from 'offset' (defaults to the rest of the file), where
+    'access' is "r" (read-only), "w" (writes go to the file) or "c" (copy-on-write, writes stay in memory).
+    Indexing and slicing return memoryview slices of the mapping, so no byte is copied until it is used.
+    'offset' need not be aligned to mmap.ALLOCATIONGRANULARITY. Use it as a context manager;
+    slices must be released (or copied with bytes()) before the map is closed.
+    '''
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self, path, access="r", offset=0, length=None):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        if access not in _ACCESS:
+            raise ValueError("'access' should be \"r\", \"w\" or \"c\"")
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("'offset' and 'length' can't be negative")
+        self.path = path
+        self.access = access
+        self.offset = offset
+        self.__mmap = None
+        self.__delta = 0
+        mode, flags = _ACCESS[access]
+        with open(path, flags) as f:
+            size = os.fstat(f.fileno()).st_size
+            if length is None:
+                length = max(size - offset, 0)
+            if length == 0:
+                self.__view = memoryview(b"" if access == "r" else bytearray())
+                return
+            # mappings start on a granularity boundary; the bytes before 'offset' are hidden by the view
+            self.__delta = offset % mmap.ALLOCATIONGRANULARITY
+            self.__mmap = mmap.mmap(f.fileno(), length + self.__delta, access=mode, offset=offset - self.__delta)
+        self.__view = memoryview(self.__mmap)[self.__delta:]
+
+    #----------------------- Methods ------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<MappedFile r"%s" access=%r offset=%i length=%i%s>' % (
+            self.path, self.access, self.offset, len(self), " closed" if self.closed else "")
+
+    def __len__(self):
+        '''
+        Return len(self).
+        '''
+        return self.__view.nbytes
+
+    def __getitem__(self, index):
+        '''
+        Returns x[index]: an int for an integer index, a memoryview for a slice.
+        '''
+        return self.__view[index]
+
+    def __setitem__(self, index, value):
+        '''
+        Set self[index] to value, for maps opened with access "w" or "c".
+        '''
+        self.__view[index] = value
+
+    @property
+    def closed(self):
+        '''
+        type: bool
+        Gets a value indicating whether the map is closed.
+        '''
+        return self.__view is None
+
+    @property
+    def view(self):
+        '''
+        type: memoryview
+        A memoryview of the whole mapped range.
+        '''
+        if self.__view is None:
+            raise ValueError("mapped file is closed")
+        return self.__view
+
+    @property
+    def mmap(self):
+        '''
+        type: mmap.mmap or None
+        The underlying memory map (None for an empty range). It starts at 'offset' rounded down to mmap.ALLOCATIONGRANULARITY.
+        '''
+        return self.__mmap
+
+    def slice(self, start=0, stop=None):
+        '''
+        mf.slice(start, stop) -> memoryview
+        Returns a zero-copy view of the bytes from 'start' to 'stop' (defaults to the end), relative to 'offset'.
+        '''
+        return self.view[start:stop]
+
+    def find(self, sub, start=0, end=None):
+        '''
+        mf.find(sub, start, end) -> int
+        Returns the lowest index, relative to 'offset', where 'sub' is found between 'start' and 'end', or -1, searching the map without copying it.
+        '''
+        if self.__mmap is None:
+            return -1 if sub else 0
+        delta = self.__delta
+        end = len(self) if end is None else min(end, len(self))
+        found = self.__mmap.find(sub, delta + start, delta + end)
+        return found - delta if found >= 0 else -1
+
+    def advise(self, pattern):
+        '''
+        mf.advise(pattern) -> None
+        Tells the kernel how the map will be read: "normal", "random", "sequential", "willneed" or "dontneed".
+        Does nothing where madvise is unavailable.
+        '''
+        option = getattr(mmap, _ADVICE[pattern], None)
+        if option is not None and self.__mmap is not None and hasattr(self.__mmap, "madvise"):
+            self.__mmap.madvise(option)
+
+    def flush(self):
+        '''
+        mf.flush() -> None
+        Writes the changes made through a map opened with access "w" back to the file.
+        '''
+        if self.__mmap is not None and self.access == "w":
+            self.__mmap.flush()
+
+    def close(self):
+        '''
+        mf.close() -> None
+        Flushes and unmaps the file. Raises BufferError if slices of the map are still alive.
+        '''
+        if self.__view is None:
+            return
+        self.flush()
+        if self.__mmap is not None:
+            # the view itself holds a buffer of the map: release it, and take a new one if the map can't be closed yet
+            self.__view.release()
+            try:
+                self.__mmap.close()
+            except BufferError:
+                self.__view = memoryview(self.__mmap)[self.__delta:]
+                raise BufferError("slices of '%s' are still in use; release them before closing the map" % self.path)
+            self.__mmap = None
+        self.__view = None
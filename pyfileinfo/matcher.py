@@ -0,0 +1,146 @@
+'''
+   Name matching for FileInfo directory searches
+'''
+
+import os
+import re
+import fnmatch
+from functools import lru_cache
+from .helpers import translate
+
+if os.name == 'nt':
+    _WILDCARDS = re.compile('[*?]')
+    _translate = translate
+else:
+    _WILDCARDS = re.compile(r'[*?[]')
+    _translate = fnmatch.translate
+
+_FOLD_CASE = os.path.normcase('A') != 'A'
+
+
+def _always(name):
+    return True
+
+
+def _never(name):
+    return False
+
+
+def _compile_globs(globs, suffixes=()):
+    '''
+    Builds a predicate for a list of glob patterns, testing each pattern with the cheapest check it needs:
+    exact names by set membership, '*suffix' and 'prefix*' with str.endswith/str.startswith, and anything else with one combined regex.
+    '''
+    names = set()
+    suffixes = list(suffixes)
+    prefixes = []
+    patterns = []
+    for glob in globs:
+        if _FOLD_CASE:
+            glob = os.path.normcase(glob)
+        if glob == '*':
+            return _always
+        if not _WILDCARDS.search(glob):
+            names.add(glob)
+        elif glob[0] == '*' and not _WILDCARDS.search(glob, 1):
+            suffixes.append(glob[1:])
+        elif glob[-1] == '*' and not _WILDCARDS.search(glob, 0, len(glob) - 1):
+            prefixes.append(glob[:-1])
+        else:
+            patterns.append('(?:%s)' % _translate(glob))
+    tests = []
+    if names:
+        tests.append(names.__contains__)
+    if suffixes:
+        suffixes = tuple(suffixes)
+        tests.append(lambda name: name.endswith(suffixes))
+    if prefixes:
+        prefixes = tuple(prefixes)
+        tests.append(lambda name: name.startswith(prefixes))
+    if patterns:
+        tests.append(re.compile('|'.join(patterns)).match)
+    if not tests:
+        return _never
+    if len(tests) == 1:
+        return tests[0]
+    return lambda name: any(test(name) for test in tests)
+
+
+class SearchPattern(object):
+    '''
+    SearchPattern(include="*", exclude=None, regex=None, extensions=None) -> SearchPattern object
+    A precompiled name matcher, accepted as 'search' by the FileInfo directory searches.
+    A name matches when it matches any of the 'include' globs, any of the 'regex' expressions (searched anywhere in the name; strings or compiled patterns)
+    or ends with any of the 'extensions' (".log" or "log"), and does not match any of the 'exclude' globs.
+    Each argument may be a single value or a list; globs and extensions follow the platform case rules, like fnmatch.
+    '''
+
+    def __init__(self, include="*", exclude=None, regex=None, extensions=None):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        include = self.__as_list(include)
+        regex = [re.compile(rx) for rx in self.__as_list(regex)]
+        extensions = ['.' + ext.lstrip('.') for ext in self.__as_list(extensions)]
+        if _FOLD_CASE:
+            extensions = [os.path.normcase(ext) for ext in extensions]
+        if (regex or extensions) and include == ["*"]:
+            include = []
+        self.__include = _compile_globs(include, extensions)
+        self.__regex = tuple(rx.search for rx in regex)
+        self.__exclude = _compile_globs(self.__as_list(exclude))
+        self.__description = (include, regex, extensions, self.__as_list(exclude))
+
+    @staticmethod
+    def __as_list(value):
+        if value is None:
+            return []
+        if isinstance(value, (str, type(re.compile('')))):
+            return [value]
+        return list(value)
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        include, regex, extensions, exclude = self.__description
+        return 'SearchPattern(include=%r, exclude=%r, regex=%r, extensions=%r)' % (
+            include, exclude, [rx.pattern for rx in regex], extensions)
+
+    def __call__(self, name):
+        '''
+        Returns self.match(name).
+        '''
+        return self.match(name)
+
+    def match(self, name):
+        '''
+        sp.match(name) -> bool
+        Returns True if the file name 'name' matches this pattern.
+        '''
+        key = name.lower() if _FOLD_CASE else name
+        if self.__exclude(key):
+            return False
+        if self.__include(key):
+            return True
+        for search in self.__regex:
+            if search(name):
+                return True
+        return False
+
+
+@lru_cache(maxsize=256)
+def _compile_glob(search):
+    return SearchPattern(search)
+
+
+def compile_search(search):
+    '''
+    compile_search(search) -> SearchPattern object
+    Returns 'search' compiled as a SearchPattern; 'search' may be a glob string or a SearchPattern.
+    '''
+    if isinstance(search, SearchPattern):
+        return search
+    if isinstance(search, str):
+        return _compile_glob(search)
+    raise TypeError("'search' should be a glob string or a SearchPattern")
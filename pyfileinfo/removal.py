@@ -0,0 +1,196 @@
+'''
+   Directory tree removal for FileInfo class
+'''
+
+import os
+import sys
+import stat
+import shutil
+import threading
+import uuid
+
+_HAS_DIR_FD = ({os.open, os.unlink, os.rmdir} <= os.supports_dir_fd
+               and os.scandir in os.supports_fd and hasattr(os, "O_DIRECTORY"))
+
+
+def _default_onerror(func, path, exc_info):
+    if not os.access(path, os.W_OK):
+        os.chmod(path, stat.S_IWUSR)
+        func(path)
+    else:
+        raise exc_info[1]
+
+
+def _handle(func, path, onerror, ignore_errors):
+    if ignore_errors:
+        return
+    if onerror is None:
+        raise
+    onerror(func, path, sys.exc_info())
+
+
+def _open_directory(path):
+    return os.open(path, os.O_RDONLY | os.O_DIRECTORY | getattr(os, "O_NOFOLLOW", 0))
+
+
+def _clear_directory(path, onerror, ignore_errors):
+    '''
+    Unlinks every non-directory entry of 'path' through a directory file descriptor, returning the paths of its subdirectories.
+    '''
+    subdirectories = []
+    try:
+        fd = _open_directory(path)
+    except OSError:
+        _handle(os.open, path, onerror, ignore_errors)
+        return subdirectories
+    try:
+        with os.scandir(fd) as it:
+            entries = list(it)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(os.path.join(path, entry.name))
+                continue
+            try:
+                os.unlink(entry.name, dir_fd=fd)
+            except OSError:
+                _handle(os.unlink, os.path.join(path, entry.name), onerror, ignore_errors)
+    finally:
+        os.close(fd)
+    return subdirectories
+
+
+def _remove_directories(directories, onerror, ignore_errors, executor=None):
+    '''
+    Removes the (already emptied) 'directories', deepest first; directories of the same depth are removed concurrently on the executor.
+    '''
+    levels = {}
+    for path in directories:
+        levels.setdefault(path.count(os.sep), []).append(path)
+
+    def rmdir(path):
+        try:
+            os.rmdir(path)
+        except OSError:
+            _handle(os.rmdir, path, onerror, ignore_errors)
+
+    for depth in sorted(levels, reverse=True):
+        if executor is None:
+            for path in levels[depth]:
+                rmdir(path)
+        else:
+            list(executor.map(rmdir, levels[depth]))
+
+
+def _fwalk_tree(path, onerror, ignore_errors):
+    for dirpath, dirnames, filenames, dirfd in os.fwalk(path, topdown=False):
+        for name in filenames:
+            try:
+                os.unlink(name, dir_fd=dirfd)
+            except OSError:
+                _handle(os.unlink, os.path.join(dirpath, name), onerror, ignore_errors)
+        for name in dirnames:
+            try:
+                os.rmdir(name, dir_fd=dirfd)
+            except NotADirectoryError:
+                # a symbolic link to a directory, which fwalk lists but never follows
+                try:
+                    os.unlink(name, dir_fd=dirfd)
+                except OSError:
+                    _handle(os.unlink, os.path.join(dirpath, name), onerror, ignore_errors)
+            except OSError:
+                _handle(os.rmdir, os.path.join(dirpath, name), onerror, ignore_errors)
+    try:
+        os.rmdir(path)
+    except OSError:
+        _handle(os.rmdir, path, onerror, ignore_errors)
+
+
+def _parallel_tree(path, onerror, ignore_errors, workers):
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    directories = [path]
+    with ThreadPoolExecutor(workers) as executor:
+        running = {executor.submit(_clear_directory, path, onerror, ignore_errors)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                for subdirectory in future.result():
+                    directories.append(subdirectory)
+                    running.add(executor.submit(
+                        _clear_directory, subdirectory, onerror, ignore_errors))
+        _remove_directories(directories, onerror, ignore_errors, executor)
+
+
+def remove_tree(path, ignore_errors=False, onerror=_default_onerror, workers=None):
+    '''
+    remove_tree(path, ignore_errors, onerror, workers) -> None
+    Permanently deletes the directory tree 'path', unlinking the entries relative to their directory file descriptor, so no path is resolved again for every entry.
+    With 'workers', directories are cleared concurrently on a thread pool (defaults to None, a single os.fwalk pass).
+    'ignore_errors' and 'onerror' behave as in shutil.rmtree; platforms without dir_fd support fall back to it.
+    '''
+    if not _HAS_DIR_FD:
+        shutil.rmtree(path, ignore_errors, onerror)
+    elif workers and workers > 1:
+        _parallel_tree(path, onerror, ignore_errors, workers)
+    else:
+        _fwalk_tree(path, onerror, ignore_errors)
+
+
+class DeleteHandle(object):
+    '''
+    DeleteHandle(path, target, ...) -> DeleteHandle object
+    Handle to a directory tree being removed on a background thread, after being renamed to 'path'.
+    '''
+
+    def __init__(self, path, target, *args):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.path = path
+        self.__error = None
+        self.__thread = threading.Thread(
+            target=self.__run, args=(target,) + args, name="delete_tree")
+        self.__thread.start()
+
+    def __run(self, target, *args):
+        try:
+            target(self.path, *args)
+        except BaseException as err:
+            self.__error = err
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<DeleteHandle r"%s" %s>' % (self.path, "done" if self.done else "running")
+
+    @property
+    def done(self):
+        '''
+        type: bool
+        Gets a value indicating whether the removal has finished.
+        '''
+        return not self.__thread.is_alive()
+
+    def wait(self, timeout=None):
+        '''
+        dh.wait(timeout) -> bool
+        Waits up to 'timeout' seconds (defaults to None, forever) for the removal to finish, returning True if it finished.
+        Raises the error that stopped the removal, if any.
+        '''
+        self.__thread.join(timeout)
+        if self.__thread.is_alive():
+            return False
+        if self.__error is not None:
+            raise self.__error
+        return True
+
+
+def detach_tree(path, ignore_errors=False, onerror=_default_onerror, workers=None):
+    '''
+    detach_tree(path, ignore_errors, onerror, workers) -> DeleteHandle object
+    Atomically renames the directory tree 'path' to a hidden sibling trash name and removes it with remove_tree() on a background thread.
+    '''
+    parent, name = os.path.split(os.path.normpath(path))
+    trash = os.path.join(parent, ".%s.trash-%s" % (name, uuid.uuid4().hex))
+    os.rename(path, trash)
+    return DeleteHandle(trash, remove_tree, ignore_errors, onerror, workers)
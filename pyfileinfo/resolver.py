@@ -0,0 +1,16 @@
+'''
+   Incremental path resolution for FileInfo class
+'''
+
+import os
+
+
+def resolve_entry(entry, parent):
+    '''
+    resolve_entry(entry, parent) -> str
+    Returns the canonical path of the os.DirEntry 'entry', listed from the directory whose canonical path is 'parent'.
+    Only symbolic links are resolved again; the path of any other entry is derived from 'parent', without an lstat per path component.
+    '''
+    if parent is None or entry.is_symlink():
+        return os.path.realpath(entry.path)
+    return os.path.join(parent, entry.name)
@@ -0,0 +1,303 @@
+'''
+   Persistent directory tree snapshots for FileInfo class
+'''
+
+import os
+import stat
+import time
+import zlib
+import struct
+from collections import namedtuple
+
+MAGIC = b"PFISNAP1"
+
+_HEADER = struct.Struct("<qI")
+_DIRECTORY = struct.Struct("<qII")
+_ENTRY = struct.Struct("<qqIQH")
+
+# a directory modified within this many nanoseconds of the scan start may change again without its mtime moving
+_RACY_NS = 2 * 1000000000
+
+
+class SnapshotEntry(namedtuple("SnapshotEntry", "path size mtime_ns mode inode")):
+    '''
+    SnapshotEntry(path, size, mtime_ns, mode, inode)
+    An entry of a TreeSnapshot; 'path' is relative to the snapshot root and the metadata is that of the entry itself (symbolic links are not followed).
+    '''
+    __slots__ = ()
+
+    @property
+    def is_dir(self):
+        '''
+        type: bool
+        Gets a value indicating whether the entry is a directory.
+        '''
+        return stat.S_ISDIR(self.mode)
+
+
+def _list_directory(path):
+    '''
+    Returns (mtime_ns, entries) for the directory 'path', where entries is a list of (name, size, mtime_ns, mode, inode).
+    The directory is stat'ed before being listed, so a change made while listing leaves a newer mtime behind.
+    '''
+    mtime_ns = os.stat(path).st_mtime_ns
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            entries.append((entry.name, st.st_size, st.st_mtime_ns, st.st_mode, st.st_ino))
+    return mtime_ns, entries
+
+
+class TreeSnapshot(object):
+    '''
+    TreeSnapshot(root) -> TreeSnapshot object
+    Metadata of a whole directory tree: size, mtime_ns, mode and inode of every entry, plus the mtime of every directory.
+    Snapshots are taken with TreeSnapshot.capture(), written with save() and read back with TreeSnapshot.load();
+    rescan() produces a new snapshot, listing again only the directories whose mtime changed.
+    '''
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self, root):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.root = root
+        self.scan_time_ns = 0
+        self.listed_directories = 0
+        self.reused_directories = 0
+        # relative directory path -> (mtime_ns, [(name, size, mtime_ns, mode, inode), ...])
+        self.__directories = {}
+
+    @classmethod
+    def capture(cls, path, workers=None, recursive=True):
+        '''
+        TreeSnapshot.capture(path, workers, recursive) -> TreeSnapshot object
+        Walks the directory tree 'path' (only the directory itself if 'recursive' is False) and returns its snapshot.
+        'workers' sets the number of threads listing directories concurrently (defaults to None, a single-threaded walk).
+        '''
+        return cls(os.path.abspath(path)).rescan(workers=workers, recursive=recursive)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        TreeSnapshot.load(path) -> TreeSnapshot object
+        Reads a snapshot written by save().
+        '''
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("'%s' is not a snapshot file" % path)
+            data = zlib.decompress(f.read())
+        scan_time_ns, size = _HEADER.unpack_from(data, 0)
+        offset = _HEADER.size
+        result = cls(os.fsdecode(data[offset:offset + size]))
+        result.scan_time_ns = scan_time_ns
+        offset += size
+        directories = result.__directories
+        unpack_directory = _DIRECTORY.unpack_from
+        unpack_entry = _ENTRY.unpack_from
+        while offset < len(data):
+            mtime_ns, size, count = unpack_directory(data, offset)
+            offset += _DIRECTORY.size
+            relative = os.fsdecode(data[offset:offset + size])
+            offset += size
+            entries = []
+            for _ in range(count):
+                entry_size, entry_mtime, mode, inode, size = unpack_entry(data, offset)
+                offset += _ENTRY.size
+                entries.append((os.fsdecode(data[offset:offset + size]), entry_size, entry_mtime, mode, inode))
+                offset += size
+            directories[relative] = (mtime_ns, entries)
+        return result
+
+    #----------------------- Methods ------------------------------
+    def __len__(self):
+        '''
+        Return len(self), the number of entries below the root.
+        '''
+        return sum(len(entries) for mtime_ns, entries in self.__directories.values())
+
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<TreeSnapshot r"%s" directories=%i entries=%i>' % (self.root, len(self.__directories), len(self))
+
+    def __iter__(self):
+        '''
+        Implement iter(self), yielding a SnapshotEntry per entry, directory by directory in sorted order.
+        '''
+        directories = self.__directories
+        for relative in sorted(directories):
+            for name, size, mtime_ns, mode, inode in directories[relative][1]:
+                yield SnapshotEntry(os.path.join(relative, name), size, mtime_ns, mode, inode)
+
+    def __contains__(self, path):
+        '''
+        Return path in self.
+        '''
+        return self.get(path) is not None
+
+    def get(self, path):
+        '''
+        ts.get(path) -> SnapshotEntry or None
+        Returns the entry at 'path', relative to the snapshot root, or None if the snapshot has no such entry.
+        '''
+        relative, name = os.path.split(os.path.normpath(path))
+        record = self.__directories.get(relative)
+        if record is not None:
+            for entry in record[1]:
+                if entry[0] == name:
+                    return SnapshotEntry(path, *entry[1:])
+        return None
+
+    def entries(self, relative=""):
+        '''
+        ts.entries(relative) -> list of SnapshotEntry
+        Returns the entries of the directory 'relative' (defaults to "", the root), or an empty list if the snapshot has no such directory.
+        '''
+        record = self.__directories.get(os.path.normpath(relative) if relative else "")
+        if record is None:
+            return []
+        return [SnapshotEntry(os.path.join(relative, entry[0]), *entry[1:]) for entry in record[1]]
+
+    def directories(self):
+        '''
+        ts.directories() -> list of str
+        Returns the relative paths of the directories in the snapshot, "" being the root.
+        '''
+        return sorted(self.__directories)
+
+    def save(self, path):
+        '''
+        ts.save(path) -> None
+        Writes the snapshot to the file 'path' in a compact, zlib compressed binary format.
+        The file is written next to 'path' and renamed over it, so an interrupted save leaves the previous snapshot intact.
+        '''
+        temp = "%s.%i.tmp" % (path, os.getpid())
+        compressor = zlib.compressobj()
+        pack_entry = _ENTRY.pack
+        with open(temp, 'wb') as f:
+            f.write(MAGIC)
+            root = os.fsencode(self.root)
+            f.write(compressor.compress(_HEADER.pack(self.scan_time_ns, len(root)) + root))
+            for relative, (mtime_ns, entries) in self.__directories.items():
+                encoded = os.fsencode(relative)
+                chunk = [_DIRECTORY.pack(mtime_ns, len(encoded), len(entries)), encoded]
+                for name, size, entry_mtime, mode, inode in entries:
+                    name = os.fsencode(name)
+                    chunk.append(pack_entry(size, entry_mtime, mode, inode, len(name)))
+                    chunk.append(name)
+                f.write(compressor.compress(b"".join(chunk)))
+            f.write(compressor.flush())
+        os.replace(temp, path)
+
+    def changes(self, newer):
+        '''
+        ts.changes(newer) -> generator over (SnapshotEntry or None, SnapshotEntry or None)
+        Yields the pairs (old, new) of the entries that were removed (new is None), added (old is None) or modified between this snapshot and 'newer',
+        directory by directory in sorted order. Entries are modified when their size, modification time, mode or inode changed;
+        directories only when their mode or inode changed, their own changes being reported through their entries.
+        Directories reused as is by rescan() are skipped without comparing their entries.
+        '''
+        old_directories = self.__directories
+        new_directories = newer.__directories
+        empty = (0, [])
+        for relative in sorted(set(old_directories).union(new_directories)):
+            old_record = old_directories.get(relative, empty)
+            new_record = new_directories.get(relative, empty)
+            if old_record[1] is new_record[1] or old_record[1] == new_record[1]:
+                continue
+            current = {entry[0]: entry for entry in new_record[1]}
+            for entry in old_record[1]:
+                name = entry[0]
+                other = current.pop(name, None)
+                if other == entry:
+                    continue
+                if other is not None and stat.S_ISDIR(entry[3]) and stat.S_ISDIR(other[3]) and entry[4] == other[4]:
+                    continue
+                path = os.path.join(relative, name)
+                yield SnapshotEntry(path, *entry[1:]), None if other is None else SnapshotEntry(path, *other[1:])
+            for name, entry in current.items():
+                yield None, SnapshotEntry(os.path.join(relative, name), *entry[1:])
+
+    def rescan(self, workers=None, verify_files=False, recursive=True):
+        '''
+        ts.rescan(workers, verify_files, recursive) -> TreeSnapshot object
+        Returns a new snapshot of the same root. Every directory is stat'ed, but only those whose mtime changed since this snapshot are listed again;
+        the entries of the others are reused, and their subdirectories are checked in turn.
+        A directory mtime does not change when a file inside is rewritten in place: with 'verify_files' True, the files of reused directories
+        are stat'ed again (but still not listed), otherwise their metadata is taken from this snapshot.
+        If 'recursive' is False, only the root directory is scanned.
+        '''
+        result = TreeSnapshot(self.root)
+        result.scan_time_ns = time.time_ns() if hasattr(time, "time_ns") else int(time.time() * 1000000000)
+        racy = result.scan_time_ns - _RACY_NS
+        previous = self.__directories
+        directories = result.__directories
+
+        def scan(relative):
+            path = os.path.join(self.root, relative)
+            record = previous.get(relative)
+            try:
+                if record is not None and os.stat(path).st_mtime_ns == record[0]:
+                    mtime_ns, entries = record
+                    if verify_files:
+                        entries = _verify(path, entries)
+                    reused = True
+                else:
+                    mtime_ns, entries = _list_directory(path)
+                    reused = False
+            except OSError:
+                return relative, None, False
+            if mtime_ns >= racy:
+                # a change within the same timestamp tick would go unnoticed; list this directory again next time
+                mtime_ns = -1
+            return relative, (mtime_ns, entries), reused
+
+        def store(relative, record, reused):
+            if record is None:
+                return []
+            directories[relative] = record
+            if reused:
+                result.reused_directories += 1
+            else:
+                result.listed_directories += 1
+            if not recursive:
+                return []
+            return [os.path.join(relative, name) for name, size, mtime_ns, mode, inode in record[1] if stat.S_ISDIR(mode)]
+
+        if workers and workers > 1:
+            from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+            with ThreadPoolExecutor(workers) as executor:
+                running = {executor.submit(scan, "")}
+                while running:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for relative in store(*future.result()):
+                            running.add(executor.submit(scan, relative))
+        else:
+            pending = [""]
+            while pending:
+                pending.extend(store(*scan(pending.pop())))
+        return result
+
+
+def _verify(path, entries):
+    '''
+    Stats again the non-directory entries of the directory 'path', dropping those that vanished.
+    '''
+    verified = []
+    for entry in entries:
+        if stat.S_ISDIR(entry[3]):
+            verified.append(entry)
+            continue
+        try:
+            st = os.lstat(os.path.join(path, entry[0]))
+        except OSError:
+            continue
+        verified.append((entry[0], st.st_size, st.st_mtime_ns, st.st_mode, st.st_ino))
+    return verified
@@ -0,0 +1,183 @@
+'''
+   statx(2) metadata for FileInfo class
+'''
+
+import os
+import sys
+import errno
+import threading
+from collections import namedtuple
+from .helpers import StatFields
+
+BASIC_STATS = 0x7ff
+ALL = BASIC_STATS | StatFields.BTIME
+
+AT_FDCWD = -100
+AT_SYMLINK_NOFOLLOW = 0x100
+AT_STATX_SYNC_AS_STAT = 0x0
+AT_STATX_FORCE_SYNC = 0x2000
+AT_STATX_DONT_SYNC = 0x4000
+
+_statx = None
+_statx_lock = threading.Lock()
+_Statx = None
+
+
+def _load():
+    '''
+    Returns the libc statx function, or False where it is unavailable (not Linux, or a C library older than glibc 2.28).
+    '''
+    global _statx, _Statx
+    with _statx_lock:
+        if _statx is not None:
+            return _statx
+        _statx = False
+        if not sys.platform.startswith("linux"):
+            return _statx
+        try:
+            import ctypes
+            import ctypes.util
+            function = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True).statx
+        except (OSError, AttributeError):
+            return _statx
+
+        class Timestamp(ctypes.Structure):
+            _fields_ = [("tv_sec", ctypes.c_int64), ("tv_nsec", ctypes.c_uint32), ("reserved", ctypes.c_int32)]
+
+        class Statx(ctypes.Structure):
+            # struct statx from linux/stat.h, padded to its 256 bytes
+            _fields_ = [("stx_mask", ctypes.c_uint32), ("stx_blksize", ctypes.c_uint32), ("stx_attributes", ctypes.c_uint64),
+                        ("stx_nlink", ctypes.c_uint32), ("stx_uid", ctypes.c_uint32), ("stx_gid", ctypes.c_uint32),
+                        ("stx_mode", ctypes.c_uint16), ("spare0", ctypes.c_uint16),
+                        ("stx_ino", ctypes.c_uint64), ("stx_size", ctypes.c_uint64), ("stx_blocks", ctypes.c_uint64),
+                        ("stx_attributes_mask", ctypes.c_uint64),
+                        ("stx_atime", Timestamp), ("stx_btime", Timestamp), ("stx_ctime", Timestamp), ("stx_mtime", Timestamp),
+                        ("stx_rdev_major", ctypes.c_uint32), ("stx_rdev_minor", ctypes.c_uint32),
+                        ("stx_dev_major", ctypes.c_uint32), ("stx_dev_minor", ctypes.c_uint32),
+                        ("spare", ctypes.c_uint64 * 14)]
+
+        function.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(Statx)]
+        function.restype = ctypes.c_int
+        _Statx = Statx
+        _statx = function
+        return _statx
+
+
+def available():
+    '''
+    available() -> bool
+    Returns whether statx() calls the statx(2) system call here, rather than falling back to os.stat.
+    '''
+    return bool(_load())
+
+
+def _ns(timestamp):
+    return timestamp.tv_sec * 1000000000 + timestamp.tv_nsec
+
+
+def _seconds(ns):
+    return None if ns is None else ns / 1000000000
+
+
+class StatxResult(namedtuple("StatxResult", "mask st_mode st_ino st_dev st_nlink st_uid st_gid st_size st_blocks st_blksize "
+                                            "st_atime_ns st_mtime_ns st_ctime_ns st_birthtime_ns st_rdev st_attributes")):
+    '''
+    StatxResult(mask, st_mode, st_ino, st_dev, st_nlink, st_uid, st_gid, st_size, st_blocks, st_blksize,
+                st_atime_ns, st_mtime_ns, st_ctime_ns, st_birthtime_ns, st_rdev, st_attributes)
+    The metadata returned by statx(), named like os.stat_result. 'mask' holds the StatFields bits actually filled in;
+    the fields outside it are None (the file system may not report a birth time, and fields that were not requested may be left out).
+    '''
+    __slots__ = ()
+
+    @property
+    def st_atime(self):
+        '''
+        type: float
+        Gets the time of the last access, in seconds.
+        '''
+        return _seconds(self.st_atime_ns)
+
+    @property
+    def st_mtime(self):
+        '''
+        type: float
+        Gets the time of the last modification, in seconds.
+        '''
+        return _seconds(self.st_mtime_ns)
+
+    @property
+    def st_ctime(self):
+        '''
+        type: float
+        Gets the time of the last status change, in seconds.
+        '''
+        return _seconds(self.st_ctime_ns)
+
+    @property
+    def st_birthtime(self):
+        '''
+        type: float
+        Gets the creation time, in seconds, or None where the file system does not record it.
+        '''
+        return _seconds(self.st_birthtime_ns)
+
+    @classmethod
+    def from_stat(cls, st):
+        '''
+        StatxResult.from_stat(st) -> StatxResult
+        Converts an os.stat_result. The birth time comes from st_birthtime where the platform has it (macOS, BSD),
+        or from st_ctime on Windows, where it is the creation time.
+        '''
+        birthtime = getattr(st, "st_birthtime", None)
+        if birthtime is not None:
+            birthtime = int(birthtime * 1000000000)
+        elif sys.platform.startswith("win"):
+            birthtime = st.st_ctime_ns
+        return cls(BASIC_STATS | (StatFields.BTIME if birthtime is not None else 0), st.st_mode, st.st_ino, st.st_dev,
+                   st.st_nlink, st.st_uid, st.st_gid, st.st_size, getattr(st, "st_blocks", None), getattr(st, "st_blksize", None),
+                   st.st_atime_ns, st.st_mtime_ns, st.st_ctime_ns, birthtime, getattr(st, "st_rdev", None),
+                   getattr(st, "st_file_attributes", 0))
+
+
+def statx(path, fields=ALL, dont_sync=False, follow_symlinks=True):
+    '''
+    statx(path, fields, dont_sync, follow_symlinks) -> StatxResult
+    Returns the metadata of 'path', asking the kernel only for 'fields' (a combination of StatFields values, defaults to all of them, see BASIC_STATS),
+    so a network file system only revalidates what is needed. With 'dont_sync' True (AT_STATX_DONT_SYNC),
+    the attributes cached locally are returned as they are, without a round trip to the server.
+    On platforms without statx(2), os.stat is used instead and 'fields' and 'dont_sync' are ignored.
+    '''
+    global _statx
+    if isinstance(fields, StatFields):
+        fields = fields.value
+    function = _load()
+    if function:
+        import ctypes
+        flags = (AT_STATX_DONT_SYNC if dont_sync else AT_STATX_SYNC_AS_STAT) | (0 if follow_symlinks else AT_SYMLINK_NOFOLLOW)
+        buf = _Statx()
+        if function(AT_FDCWD, os.fsencode(path), flags, fields, ctypes.byref(buf)) == 0:
+            return _result(buf)
+        err = ctypes.get_errno()
+        if err not in (errno.ENOSYS, errno.EPERM):
+            raise OSError(err, os.strerror(err), path)
+        # a kernel older than 4.11, or a seccomp filter denying the call: use os.stat from now on
+        with _statx_lock:
+            _statx = False
+    return StatxResult.from_stat(os.stat(path, follow_symlinks=follow_symlinks))
+
+
+def _result(buf):
+    # some file systems set STATX_BTIME with a zero birth time: that is no more a creation time than a missing one
+    if not buf.stx_btime.tv_sec and not buf.stx_btime.tv_nsec:
+        buf.stx_mask &= ~StatFields.BTIME
+    mask = buf.stx_mask
+
+    def field(bit, value):
+        return value if mask & bit else None
+    return StatxResult(mask, field(StatFields.TYPE | StatFields.MODE, buf.stx_mode), field(StatFields.INO, buf.stx_ino),
+                       os.makedev(buf.stx_dev_major, buf.stx_dev_minor), field(StatFields.NLINK, buf.stx_nlink),
+                       field(StatFields.UID, buf.stx_uid), field(StatFields.GID, buf.stx_gid), field(StatFields.SIZE, buf.stx_size),
+                       field(StatFields.BLOCKS, buf.stx_blocks), buf.stx_blksize,
+                       field(StatFields.ATIME, _ns(buf.stx_atime)), field(StatFields.MTIME, _ns(buf.stx_mtime)),
+                       field(StatFields.CTIME, _ns(buf.stx_ctime)), _ns(buf.stx_btime) or None,
+                       os.makedev(buf.stx_rdev_major, buf.stx_rdev_minor), buf.stx_attributes)
@@ -0,0 +1,64 @@
+'''
+   Streaming file readers for FileInfo class
+'''
+
+import codecs
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_chunks(path, size=DEFAULT_CHUNK_SIZE, offset=0, length=None):
+    '''
+    iter_chunks(path, size, offset, length) -> generator over memoryview
+    Reads 'length' bytes of the file 'path' from 'offset' (defaults to the rest of the file) in chunks of up to 'size' bytes,
+    with readinto() on a single preallocated buffer, so no memory is allocated per chunk.
+    Each chunk is a view of that buffer, overwritten by the next one: copy it with bytes() to keep it.
+    '''
+    buf = bytearray(size)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        if offset:
+            f.seek(offset)
+        while length is None or length > 0:
+            n = f.readinto(buf if length is None or length >= size else view[:length])
+            if not n:
+                break
+            if length is not None:
+                length -= n
+            yield view[:n]
+
+
+def iter_lines(path, encoding="utf-8", errors="strict", buffer_size=DEFAULT_CHUNK_SIZE, keepends=False):
+    '''
+    iter_lines(path, encoding, errors, buffer_size, keepends) -> generator over str (bytes if 'encoding' is None)
+    Returns a generator over the lines of the file 'path', read in blocks of 'buffer_size' bytes that are decoded
+    and split whole, instead of line by line. Lines end with "\\n"; a "\\r" before it is dropped with the newline
+    unless 'keepends' is True, in which case the line endings are kept as they are in the file.
+    '''
+    newline = "\n" if encoding is not None else b"\n"
+    carriage = "\r" if encoding is not None else b"\r"
+    empty = newline[:0]
+    decode = codecs.getincrementaldecoder(encoding)(errors).decode if encoding is not None else None
+    parts = []
+    for chunk in iter_chunks(path, buffer_size):
+        block = decode(chunk) if decode is not None else bytes(chunk)
+        if newline not in block:
+            parts.append(block)
+            continue
+        if parts:
+            parts.append(block)
+            block = empty.join(parts)
+            parts = []
+        lines = block.split(newline)
+        parts.append(lines.pop())
+        if keepends:
+            for line in lines:
+                yield line + newline
+        else:
+            for line in lines:
+                yield line[:-1] if line.endswith(carriage) else line
+    if decode is not None:
+        parts.append(decode(b"", True))
+    last = empty.join(parts)
+    if last:
+        yield last if keepends or not last.endswith(carriage) else last[:-1]
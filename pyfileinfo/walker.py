@@ -0,0 +1,152 @@
+'''
+   Directory enumeration engine for FileInfo class
+'''
+
+import os
+from collections import deque, namedtuple
+
+
+DirectoryUsage = namedtuple("DirectoryUsage", "files length allocated")
+DirectoryUsage.__doc__ = '''
+    DirectoryUsage(files, length, allocated)
+    Totals of a directory: number of files, apparent size in bytes and bytes allocated on disk.
+    '''
+
+
+def scan_directory(path, prefetch_stat=False, stat_directories=False):
+    '''
+    scan_directory(path, prefetch_stat, stat_directories) -> list of os.DirEntry
+    Lists a single directory with os.scandir.
+    The entries keep the type information returned by the directory listing, so is_dir()/is_file() cost no extra syscall on most platforms.
+    If 'prefetch_stat' is True, the stat of every entry is also read and cached on the entry; if 'stat_directories' is True, only that of the directories.
+    '''
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        # entries of unknown type (some network file systems) are resolved here, inside the listing worker
+        is_dir = entry.is_dir()
+        if prefetch_stat or (stat_directories and is_dir):
+            try:
+                entry.stat()
+            except OSError:
+                pass
+    return entries
+
+
+def iter_entries(path, recursive=False, workers=None, ordered=True, max_pending=None, prefetch_stat=False, max_queue=None):
+    '''
+    iter_entries(path, recursive, workers, ordered, max_pending, prefetch_stat, max_queue) -> generator over os.DirEntry
+    Returns a generator over the entries of the directory 'path'.
+    If 'recursive' is True, subdirectories are walked breadth-first, in the same order the listing returns them.
+    'workers' sets the number of threads listing subdirectories concurrently (defaults to None, a single-threaded walk).
+    With workers, 'ordered' keeps the single-threaded output order (defaults to True), otherwise directories are yielded as soon as they are listed;
+    'max_pending' bounds the directory listings running or waiting to be consumed (defaults to 4 per worker),
+    and 'max_queue' the directories found but not listed yet past which no new listing is started (defaults to 1024 per worker).
+    Symbolic links to directories are followed, but every directory is walked once, so a link cycle ends.
+    '''
+    if recursive and workers and workers > 1:
+        return _iter_parallel(path, workers, ordered, max_pending or 4 * workers, max_queue or 1024 * workers, prefetch_stat)
+    return _iter_serial(path, recursive, prefetch_stat)
+
+
+def _visited(path):
+    st = os.stat(path)
+    return {(st.st_dev, st.st_ino)}
+
+
+def _descend(entry, visited):
+    '''
+    Returns whether the walk should list the directory entry 'entry', recording it in 'visited', the (st_dev, st_ino) of the directories walked.
+    '''
+    if not entry.is_dir():
+        return False
+    key = directory_key(entry)
+    if key is None or key in visited:
+        return False
+    visited.add(key)
+    return True
+
+
+def directory_key(entry):
+    '''
+    directory_key(entry) -> tuple or None
+    Returns the (st_dev, st_ino) identifying the directory the os.DirEntry 'entry' is (or links to), or None if it can't be read.
+    Walks keep these keys to list every directory once, even when symbolic links lead back to it.
+    '''
+    try:
+        st = entry.stat()
+        if not st.st_ino:
+            # os.DirEntry.stat leaves the inode number out on Windows
+            st = os.stat(entry.path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _iter_serial(path, recursive, prefetch_stat):
+    pending = deque([path])
+    visited = _visited(path) if recursive else None
+    while pending:
+        for entry in scan_directory(pending.popleft(), prefetch_stat, recursive):
+            yield entry
+            if recursive and _descend(entry, visited):
+                pending.append(entry.path)
+
+
+def _iter_parallel(path, workers, ordered, max_pending, max_queue, prefetch_stat):
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    waiting = deque([path])
+    running = deque()
+    visited = _visited(path)
+    with ThreadPoolExecutor(workers) as executor:
+        try:
+            while waiting or running:
+                while waiting and len(running) < max_pending:
+                    if len(waiting) <= max_queue:
+                        directory = waiting.popleft()
+                    elif running:
+                        # over the limit, no new listing starts until the running ones are consumed
+                        break
+                    else:
+                        # then one at a time, the deepest first when the order is free, so the queue drains instead of widening
+                        directory = waiting.popleft() if ordered else waiting.pop()
+                    running.append(executor.submit(scan_directory, directory, prefetch_stat, True))
+                if ordered:
+                    future = running.popleft()
+                else:
+                    future = next(iter(wait(running, return_when=FIRST_COMPLETED).done))
+                    running.remove(future)
+                for entry in future.result():
+                    yield entry
+                    if _descend(entry, visited):
+                        waiting.append(entry.path)
+        finally:
+            for future in running:
+                future.cancel()
+
+
+def directory_usage(path, recursive=False, match=None, dedupe_links=True, workers=None):
+    '''
+    directory_usage(path, recursive, match, dedupe_links, workers) -> DirectoryUsage
+    Sums the sizes of the files in the directory 'path' (whose names pass 'match', if given), with a single stat per entry.
+    If 'dedupe_links' is True, files sharing the same (st_dev, st_ino) are counted once.
+    The allocated size comes from st_blocks where the platform reports it, and falls back to the apparent size elsewhere.
+    '''
+    files = length = allocated = 0
+    seen = set()
+    for entry in iter_entries(path, recursive, workers, False, prefetch_stat=True):
+        if not entry.is_file() or (match is not None and not match(entry.name)):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if dedupe_links and st.st_ino and st.st_nlink > 1:
+            key = (st.st_dev, st.st_ino)
+            if key in seen:
+                continue
+            seen.add(key)
+        files += 1
+        length += st.st_size
+        allocated += st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+    return DirectoryUsage(files, length, allocated)
@@ -0,0 +1,451 @@
+'''
+   Directory change notifications for FileInfo class
+'''
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+from .snapshot import TreeSnapshot
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+MOVED = "moved"
+# events were lost (the kernel queue overflowed): the consumer should rescan the tree
+OVERFLOW = "overflow"
+
+WatchEvent = namedtuple("WatchEvent", "kind path dest_path is_directory")
+WatchEvent.__doc__ = '''
+    WatchEvent(kind, path, dest_path, is_directory)
+    A change in a watched directory tree: 'kind' is one of "created", "modified", "deleted", "moved" or "overflow";
+    'dest_path' is the new path of a moved entry, None otherwise.
+    '''
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+               | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+# how long a MOVED_FROM waits for its MOVED_TO, which may arrive in a later read, before the entry is reported deleted
+_MOVE_WAIT = 0.5
+
+
+def _libc():
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    # raises AttributeError where the C library has no inotify
+    libc.inotify_init1
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+    return libc, ctypes.get_errno
+
+
+class _InotifyBackend(object):
+    '''
+    Reads changes from the Linux inotify API through ctypes, with a watch on every directory of the tree.
+    '''
+
+    def __init__(self, root, recursive):
+        self.__libc, self.__get_errno = _libc()
+        self.__root = root
+        self.__recursive = recursive
+        self.__watches = {}
+        self.__moves = OrderedDict()
+        self.__wake_fds = ()
+        self.__fd = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.__fd < 0:
+            err = self.__get_errno()
+            raise OSError(err, os.strerror(err))
+        try:
+            self.__wake_fds = os.pipe()
+            os.set_blocking(self.__wake_fds[1], False)
+            self.__add_tree(root, None)
+        except OSError:
+            self.close()
+            raise
+
+    def __add_watch(self, path):
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = self.__get_errno()
+            # the directory vanished or was replaced before being watched
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise OSError(err, os.strerror(err), path)
+        self.__watches[wd] = path
+        return True
+
+    def __add_tree(self, path, events):
+        '''
+        Watches the directory 'path' and, when recursive, its subdirectories; entries found there are reported into 'events'
+        (if given), since they may have been created before the watch existed.
+        '''
+        pending = [path]
+        while pending:
+            directory = pending.pop()
+            if not self.__add_watch(directory):
+                continue
+            if not self.__recursive and directory != self.__root:
+                continue
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if events is not None:
+                    events.append(WatchEvent(CREATED, entry.path, None, is_dir))
+                if is_dir and self.__recursive:
+                    pending.append(entry.path)
+
+    def __rename_watches(self, old, new):
+        prefix = os.path.join(old, "")
+        for wd, path in list(self.__watches.items()):
+            if path == old:
+                self.__watches[wd] = new
+            elif path.startswith(prefix):
+                self.__watches[wd] = os.path.join(new, path[len(prefix):])
+
+    def __remove_watches(self, old):
+        prefix = os.path.join(old, "")
+        for wd, path in list(self.__watches.items()):
+            if path == old or path.startswith(prefix):
+                self.__libc.inotify_rm_watch(self.__fd, wd)
+                del self.__watches[wd]
+
+    def poll(self, timeout):
+        '''
+        Returns the events read within 'timeout' seconds (None to block until there are some), or none once woken by wake().
+        '''
+        if self.__moves:
+            # return in time for flush() to report the moves whose destination never came
+            left = max(next(iter(self.__moves.values()))[2] + _MOVE_WAIT - time.monotonic(), 0)
+            timeout = left if timeout is None else min(timeout, left)
+        ready = select.select([self.__fd, self.__wake_fds[0]], [], [], timeout)[0]
+        if not ready or self.__wake_fds[0] in ready:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.__fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            self.__parse(data, events)
+            if len(data) < _READ_SIZE // 2:
+                break
+        return events
+
+    def __parse(self, data, events):
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, size = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + size].rstrip(b"\0"))
+            offset += size
+            if mask & IN_Q_OVERFLOW:
+                events.append(WatchEvent(OVERFLOW, self.__root, None, True))
+                continue
+            directory = self.__watches.get(wd)
+            if mask & IN_IGNORED:
+                self.__watches.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & IN_CREATE:
+                events.append(WatchEvent(CREATED, path, None, is_dir))
+                if is_dir and self.__recursive:
+                    self.__add_tree(path, events)
+            elif mask & (IN_MODIFY | IN_ATTRIB):
+                if name:
+                    events.append(WatchEvent(MODIFIED, path, None, is_dir))
+            elif mask & IN_DELETE:
+                events.append(WatchEvent(DELETED, path, None, is_dir))
+            elif mask & IN_DELETE_SELF:
+                if path == self.__root:
+                    events.append(WatchEvent(DELETED, path, None, True))
+            elif mask & IN_MOVED_FROM:
+                self.__moves[cookie] = (path, is_dir, time.monotonic())
+            elif mask & IN_MOVED_TO:
+                source = self.__moves.pop(cookie, None)
+                if source is None:
+                    events.append(WatchEvent(CREATED, path, None, is_dir))
+                    if is_dir and self.__recursive:
+                        self.__add_tree(path, events)
+                else:
+                    events.append(WatchEvent(MOVED, source[0], path, is_dir))
+                    if is_dir:
+                        self.__rename_watches(source[0], path)
+
+    def flush(self):
+        '''
+        Returns the moves whose destination was not seen within _MOVE_WAIT seconds: the entries left the watched tree.
+        The more recent ones are kept for the next read, where their MOVED_TO may still arrive.
+        '''
+        events = []
+        now = time.monotonic()
+        while self.__moves:
+            cookie, (path, is_dir, since) = next(iter(self.__moves.items()))
+            if now - since < _MOVE_WAIT:
+                break
+            del self.__moves[cookie]
+            events.append(WatchEvent(DELETED, path, None, is_dir))
+            if is_dir:
+                self.__remove_watches(path)
+        return events
+
+    def wake(self):
+        '''
+        Makes a poll() waiting in another thread, and every later one, return at once.
+        '''
+        if self.__wake_fds:
+            try:
+                os.write(self.__wake_fds[1], b"\0")
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+        for fd in self.__wake_fds:
+            os.close(fd)
+        self.__wake_fds = ()
+
+
+class _PollingBackend(object):
+    '''
+    Finds changes by rescanning a TreeSnapshot every 'interval' seconds and comparing it with the previous one.
+    Only the directories whose mtime changed are listed again; the files of the others are stat'ed.
+    '''
+
+    def __init__(self, root, recursive, interval):
+        self.__recursive = recursive
+        self.__interval = interval
+        self.__snapshot = TreeSnapshot.capture(root, recursive=recursive)
+        self.__next = time.monotonic() + interval
+        self.__woken = threading.Event()
+
+    def poll(self, timeout):
+        wait = self.__next - time.monotonic()
+        if timeout is not None and wait > timeout:
+            self.__woken.wait(timeout)
+            return []
+        if wait > 0 and self.__woken.wait(wait):
+            return []
+        previous = self.__snapshot
+        self.__snapshot = previous.rescan(verify_files=True, recursive=self.__recursive)
+        self.__next = time.monotonic() + self.__interval
+        return _snapshot_events(previous, self.__snapshot)
+
+    def flush(self):
+        return []
+
+    def wake(self):
+        self.__woken.set()
+
+    def close(self):
+        pass
+
+
+def _snapshot_events(previous, current):
+    '''
+    Converts the changes between two snapshots into events, pairing the removed and added entries sharing an inode into moves.
+    '''
+    root = current.root
+    events = []
+    removed = {}
+    for old, new in previous.changes(current):
+        if new is None:
+            if old.inode:
+                removed[old.inode] = len(events)
+            events.append(WatchEvent(DELETED, os.path.join(root, old.path), None, old.is_dir))
+        elif old is None:
+            index = removed.pop(new.inode, None) if new.inode else None
+            if index is not None and events[index].is_directory == new.is_dir:
+                events[index] = WatchEvent(MOVED, events[index].path, os.path.join(root, new.path), new.is_dir)
+            else:
+                events.append(WatchEvent(CREATED, os.path.join(root, new.path), None, new.is_dir))
+        else:
+            events.append(WatchEvent(MODIFIED, os.path.join(root, new.path), None, new.is_dir))
+    moved = [(os.path.join(e.path, ""), os.path.join(e.dest_path, "")) for e in events if e.kind == MOVED and e.is_directory]
+    if not moved:
+        return events
+    # the entries below a moved directory move along with it, as inotify reports it
+    result = []
+    for event in events:
+        for old, new in moved:
+            if event.kind == DELETED and event.path.startswith(old):
+                break
+            if event.kind == CREATED and event.path.startswith(new):
+                break
+            if event.kind == MOVED and event.path.startswith(old) and event.dest_path.startswith(new):
+                break
+        else:
+            result.append(event)
+    return result
+
+
+def coalesce_events(events):
+    '''
+    coalesce_events(events) -> list of WatchEvent
+    Merges a burst of events into at most one event per path, in order of first occurrence:
+    repeated modifications collapse into one, an entry created then deleted disappears, deleted then created becomes modified,
+    and a created or moved entry that is moved again is reported at its final path.
+    '''
+    state = OrderedDict()
+    for event in events:
+        if event.kind == OVERFLOW:
+            state[(OVERFLOW,)] = event
+            continue
+        prior = state.get(event.path)
+        kind = prior.kind if prior is not None else None
+        if event.kind == MOVED:
+            state.pop(event.path, None)
+            if kind == CREATED:
+                event = WatchEvent(CREATED, event.dest_path, None, event.is_directory)
+            elif kind == MOVED:
+                event = WatchEvent(MOVED, prior.path, event.dest_path, event.is_directory)
+            state.pop(event.dest_path, None)
+            state[event.dest_path] = event
+        elif event.kind == CREATED:
+            state[event.path] = event._replace(kind=MODIFIED) if kind == DELETED else event
+        elif event.kind == MODIFIED:
+            if kind not in (CREATED, MODIFIED, MOVED):
+                state[event.path] = event
+        elif event.kind == DELETED:
+            if kind == CREATED:
+                del state[event.path]
+            elif kind == MOVED:
+                state[event.path] = WatchEvent(DELETED, prior.path, None, event.is_directory)
+            else:
+                state[event.path] = event
+    return list(state.values())
+
+
+class DirectoryWatcher(object):
+    '''
+    DirectoryWatcher(path, recursive=True, interval=1.0, coalesce=0.1, polling=False) -> DirectoryWatcher object
+    Watches the directory 'path' (and its subdirectories if 'recursive' is True) for created, modified, deleted and moved entries.
+    On Linux the changes come from inotify, through ctypes; elsewhere, or if 'polling' is True or inotify is unavailable,
+    the tree is rescanned every 'interval' seconds and compared with the previous scan.
+    Bursts of events are merged with coalesce_events() once no new event arrived for 'coalesce' seconds.
+    Iterating over the watcher yields WatchEvent objects until it is closed.
+    '''
+
+    #-------------------- Constructor ---------------------------
+    def __init__(self, path, recursive=True, interval=1.0, coalesce=0.1, polling=False):
+        '''
+        Create and return a new object.  See help(type) for accurate signature.
+        '''
+        self.path = os.path.abspath(path)
+        self.recursive = recursive
+        self.coalesce = coalesce
+        self.__closed = False
+        self.__backend = None
+        if not polling and sys.platform.startswith("linux"):
+            try:
+                self.__backend = _InotifyBackend(self.path, recursive)
+            except (OSError, AttributeError):
+                # no inotify, or out of instances or watches (fs.inotify.max_user_*)
+                self.__backend = None
+        if self.__backend is None:
+            self.__backend = _PollingBackend(self.path, recursive, interval)
+
+    #----------------------- Methods ------------------------------
+    def __repr__(self):
+        '''
+        Returns repr(x).
+        '''
+        return '<DirectoryWatcher r"%s" %s>' % (self.path, self.backend)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        '''
+        Implement iter(self), yielding events until the watcher is closed.
+        '''
+        while not self.__closed:
+            for event in self.read(0.5):
+                yield event
+
+    @property
+    def backend(self):
+        '''
+        type: str
+        Gets the name of the notification backend in use: "inotify" or "polling".
+        '''
+        return "inotify" if isinstance(self.__backend, _InotifyBackend) else "polling"
+
+    def read(self, timeout=None):
+        '''
+        dw.read(timeout) -> list of WatchEvent
+        Waits up to 'timeout' seconds (defaults to None, forever) for changes, and returns them coalesced; an empty list on timeout.
+        '''
+        while not self.__closed:
+            try:
+                events = self.__backend.poll(timeout)
+            except (OSError, ValueError):
+                if self.__closed:
+                    # closed from another thread while waiting
+                    return []
+                raise
+            if events and self.coalesce:
+                deadline = time.monotonic() + 10 * self.coalesce
+                while True:
+                    quiet = min(self.coalesce, deadline - time.monotonic())
+                    if quiet <= 0:
+                        break
+                    more = self.__backend.poll(quiet)
+                    if not more:
+                        break
+                    events.extend(more)
+            events.extend(self.__backend.flush())
+            # the backend also returns early to report the moves out of the tree, which a read without timeout waits for
+            if events or timeout is not None:
+                return coalesce_events(events)
+        return []
+
+    def stop(self):
+        '''
+        dw.stop() -> None
+        Stops watching without releasing the notification resources: a read() waiting in another thread returns an empty list at once,
+        and so does every later one. Call close() once that thread is done.
+        '''
+        self.__closed = True
+        self.__backend.wake()
+
+    def close(self):
+        '''
+        dw.close() -> None
+        Stops watching and releases the notification resources.
+        '''
+        self.stop()
+        self.__backend.close()